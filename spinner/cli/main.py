@@ -1,7 +1,10 @@
 import importlib
 import os
+import pickle
+import secrets
+from multiprocessing import AuthenticationError
 
-from click import File
+from click import File, IntRange, Path
 from click import argument as arg
 from click import group
 from click import option as opt
@@ -10,9 +13,12 @@ from pydantic import ValidationError
 
 import spinner
 from spinner.app import SpinnerApp
+from spinner.runner import distributed
+from spinner.runner.journal import JournalError
+from spinner.runner.sharding import ShardError, merge_shards
 from spinner.schema import SpinnerConfig
 
-from .util import ExtraArgs
+from .util import Address, ExtraArgs, Shard
 
 # ==============================================================================
 # LOCAL FUNCTIONS
@@ -52,7 +58,41 @@ def cli(ctx, verbose) -> None:
 @opt("--output", "-o", default="benchdata.pkl", type=File("wb"))
 @opt("--benchmark", "-b", default=None, help="Run only one benchmark block by name.")
 @opt("--extra-args", "-e", type=ExtraArgs())
-def run(app, config, output, benchmark, extra_args) -> None:
+@opt(
+    "--jobs",
+    "-j",
+    default=None,
+    type=IntRange(min=1),
+    help="Number of jobs to run in parallel (default: metadata.parallelism).",
+)
+@opt(
+    "--journal",
+    default=None,
+    type=Path(dir_okay=False),
+    help="Where completed jobs are recorded (default: <output>.journal).",
+)
+@opt("--resume", is_flag=True, help="Skip jobs already recorded in the journal.")
+@opt("--no-cache", is_flag=True, help="Do not use the result cache.")
+@opt("--refresh", is_flag=True, help="Run every job again, updating the cache.")
+@opt(
+    "--shard",
+    default=None,
+    type=Shard(),
+    help="Run only part INDEX/COUNT of the sweep (e.g. 0/4), to merge later.",
+)
+def run(
+    app,
+    config,
+    output,
+    benchmark,
+    extra_args,
+    jobs,
+    journal,
+    resume,
+    no_cache,
+    refresh,
+    shard,
+) -> None:
     """Run benchmark from configuration file."""
     try:
         config = SpinnerConfig.from_stream(config)
@@ -67,7 +107,121 @@ def run(app, config, output, benchmark, extra_args) -> None:
     if not extra_args:
         extra_args = {}
 
-    spinner.runner.run(app, config, output, benchmark=benchmark, **extra_args)
+    # Only regular files get a journal by default, not e.g. /dev/null or a pipe.
+    name = output.name
+    if journal is None and name != "<stdout>":
+        if not os.path.exists(name) or os.path.isfile(name):
+            journal = f"{name}.journal"
+
+    if resume and (journal is None or not os.path.exists(journal)):
+        app.print("[b yellow]WARNING[/]: No journal to resume from, starting over.")
+
+    try:
+        spinner.runner.run(
+            app,
+            config,
+            output,
+            benchmark=benchmark,
+            extra_args=extra_args,
+            jobs=jobs,
+            journal=journal,
+            resume=resume,
+            use_cache=not no_cache,
+            refresh=refresh,
+            shard=shard,
+        )
+    except JournalError as error:
+        app.print(f"[b red]ERROR[/]: Cannot resume: {error}.")
+        raise SystemExit(1)
+
+
+@cli.command()
+@pass_obj
+@arg("CONFIG", type=File("r"))
+@opt("--output", "-o", default="benchdata.pkl", type=File("wb"))
+@opt("--benchmark", "-b", default=None, help="Run only one benchmark block by name.")
+@opt("--extra-args", "-e", type=ExtraArgs())
+@opt(
+    "--bind",
+    default="0.0.0.0:5555",
+    type=Address(),
+    help="Address workers connect to (default: 0.0.0.0:5555).",
+)
+@opt(
+    "--authkey",
+    envvar="SPINNER_AUTHKEY",
+    default=None,
+    help="Secret shared with the workers (default: a random one, printed).",
+)
+def serve(app, config, output, benchmark, extra_args, bind, authkey) -> None:
+    """Run benchmarks on the workers that connect to this node."""
+    try:
+        config = SpinnerConfig.from_stream(config)
+    except ValidationError as errors:
+        _print_errors(app, errors)
+        raise SystemExit(1)
+
+    if benchmark and config.benchmarks[benchmark] is None:
+        app.print(f"[b red]ERROR[/]: Benchmark {benchmark!r} is undefined.")
+        raise SystemExit(1)
+
+    if authkey is None:
+        authkey = secrets.token_hex(16)
+        app.print(f"Start workers with SPINNER_AUTHKEY={authkey}")
+
+    distributed.serve(
+        app,
+        config,
+        output,
+        address=bind,
+        authkey=authkey.encode(),
+        benchmark=benchmark,
+        extra_args=extra_args,
+    )
+
+
+@cli.command()
+@pass_obj
+@opt("--connect", "-c", required=True, type=Address(), help="Coordinator HOST:PORT.")
+@opt(
+    "--authkey",
+    envvar="SPINNER_AUTHKEY",
+    required=True,
+    help="Secret shared with the coordinator.",
+)
+@opt(
+    "--jobs",
+    "-j",
+    default=None,
+    type=IntRange(min=1),
+    help="Number of jobs to run in parallel (default: metadata.parallelism).",
+)
+def worker(app, connect, authkey, jobs) -> None:
+    """Run benchmarks handed out by a coordinator (see serve)."""
+    try:
+        distributed.run_worker(app, connect, authkey.encode(), jobs=jobs)
+    except (ConnectionError, AuthenticationError) as error:
+        app.print(f"[b red]ERROR[/]: Cannot connect to coordinator: {error}.")
+        raise SystemExit(1)
+
+
+@cli.command()
+@pass_obj
+@arg("SHARDS", nargs=-1, required=True, type=File("rb"))
+@opt("--output", "-o", default="benchdata.pkl", type=File("wb"))
+def merge(app, shards, output) -> None:
+    """Merge the outputs of a run split with --shard."""
+    try:
+        data = merge_shards([pickle.load(shard) for shard in shards])
+    except ShardError as error:
+        app.print(f"[b red]ERROR[/]: Cannot merge: {error}.")
+        raise SystemExit(1)
+
+    if missing := data["metadata"]["missing_shards"]:
+        app.print(f"[b yellow]WARNING[/]: Shards {missing} are missing.")
+
+    pickle.dump(data, output)
+    app.print(f"Merged {len(shards)} shards ({len(data['dataframe'])} rows).")
 
 
 @cli.command()
@@ -26,3 +26,35 @@ class ExtraArgs(click.ParamType):
             except Exception:
                 result[key] = val
         return result
+
+
+class Shard(click.ParamType):
+    name = "shard"
+    validate = re.compile(r"^(\d+)/(\d+)$")
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, tuple):
+            return value
+
+        match = self.validate.match(value)
+        if not match:
+            self.fail("Expected INDEX/COUNT, e.g. 0/4", param, ctx)
+
+        index, count = int(match[1]), int(match[2])
+        if not 0 <= index < count:
+            self.fail(f"Shard index must be between 0 and {count - 1}", param, ctx)
+        return index, count
+
+
+class Address(click.ParamType):
+    name = "address"
+    validate = re.compile(r"^(.*):(\d+)$")
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, tuple):
+            return value
+
+        match = self.validate.match(value)
+        if not match:
+            self.fail("Expected HOST:PORT, e.g. node01:5555", param, ctx)
+        return match[1] or "0.0.0.0", int(match[2])
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any
+
+# ==============================================================================
+# GLOBALS
+# ==============================================================================
+
+# Fraction of `max_size` the cache is trimmed to once full, so that the cost of
+# scanning all entries is only paid every so many stores.
+LOW_WATER_MARK = 0.9
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class ResultCache:
+    """
+    Content-addressed store of job results, kept on disk between runs.
+
+    Entries are keyed by a hash of everything that can change the result of a job:
+    the rendered command, the application spec, the captured environment, the state
+    of the declared input files and the run index. Once the cache grows beyond
+    `max_size` bytes, the least recently used entries are evicted until it is back
+    under `LOW_WATER_MARK` of that size.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        max_size: int,
+        *,
+        environment: dict[str, str | None] | None = None,
+        refresh: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.max_size = max_size
+        self.environment = repr(sorted((environment or {}).items()))
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.size = sum(x.stat().st_size for x in self.entries())
+
+    def entries(self) -> list[Path]:
+        return list(self.path.glob("*/*.pkl"))
+
+    def key(
+        self,
+        command: str,
+        application: str,
+        idx: int,
+        inputs: list[str] | None = None,
+    ) -> str:
+        """Hash everything the result of a job depends on."""
+        digest = hashlib.sha256()
+        for part in (command, application, self.environment, str(idx)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        for path in inputs or []:
+            try:
+                stat = os.stat(path)
+                state = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+            except FileNotFoundError:
+                state = f"{path}:missing"
+            digest.update(state.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the stored result of a job, or None if it must be (re)run."""
+        path = self.entry_path(key)
+        if self.refresh or not path.exists():
+            self.misses += 1
+            return None
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            # Touch the entry, so that eviction removes least recently used ones.
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: dict[str, Any]) -> None:
+        """Store the result of a job, evicting old entries if needed."""
+        path = self.entry_path(key)
+        path.parent.mkdir(exist_ok=True)
+        previous = path.stat().st_size if path.exists() else 0
+        # Write to a temporary file first, so that readers never see partial entries.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp, path)
+        self.size += path.stat().st_size - previous
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries down to the low-water mark."""
+        entries = []
+        for path in self.entries():
+            try:
+                entries.append((path.stat(), path))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda x: x[0].st_mtime_ns)
+        self.size = sum(stat.st_size for stat, _ in entries)
+        for stat, path in entries:
+            if self.size <= self.max_size * LOW_WATER_MARK:
+                break
+            path.unlink(missing_ok=True)
+            self.size -= stat.st_size
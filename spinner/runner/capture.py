@@ -0,0 +1,220 @@
+import locale
+import re
+import time
+from typing import Any, Collection, Iterator
+
+from spinner.runner.launcher import OutputBuffer
+from spinner.schema import (
+    SpinnerCapture,
+    SpinnerCaptureAll,
+    SpinnerCaptureMarker,
+    SpinnerCaptureMatches,
+)
+
+# ==============================================================================
+# GLOBALS
+# ==============================================================================
+
+# Longest line (in bytes) kept while waiting for its newline. Anything beyond that
+# is dropped, since patterns are matched against the beginning of the line.
+MAX_LINE_LENGTH = 1 << 20
+
+# Upper bound on the scanners cached by an engine, one per set of pending captures.
+MAX_SCANNERS = 64
+
+# Patterns referring to their own groups by number cannot be merged into a single
+# expression, since the numbering changes once they are combined.
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class MultiPatternScanner:
+    """
+    Match a line against the patterns of many captures in a single pass.
+
+    Patterns are merged into one alternation that acts as a prefilter: lines that
+    match none of them (usually almost all of them) are rejected at once, and only
+    the remaining lines are checked against each pattern. Patterns that cannot be
+    merged, e.g. due to flags, backreferences or group names already used by another
+    pattern, are checked on their own.
+    """
+
+    def __init__(self, captures: list[SpinnerCaptureMatches]) -> None:
+        self.captures = captures
+        self.combined = []
+        # Named groups must be unique within the merged expression.
+        groups: set[str] = set()
+        for capture in captures:
+            names = capture.pattern.groupindex.keys()
+            if self.combinable(capture.pattern) and groups.isdisjoint(names):
+                self.combined.append(capture)
+                groups.update(names)
+        self.prefilter = None
+        if self.combined:
+            try:
+                self.prefilter = re.compile(
+                    "|".join(f"(?:{x.pattern.pattern})" for x in self.combined)
+                )
+            except re.error:
+                self.combined = []
+        self.separate = [x for x in captures if not any(x is y for y in self.combined)]
+
+    def __bool__(self) -> bool:
+        return bool(self.captures)
+
+    @staticmethod
+    def combinable(pattern: re.Pattern) -> bool:
+        return pattern.flags == re.UNICODE and not _GROUP_REFERENCE.search(
+            pattern.pattern
+        )
+
+    def scan(self, line: str) -> Iterator[SpinnerCaptureMatches]:
+        """Yield every capture whose pattern matches the line."""
+        if self.prefilter is not None and self.prefilter.match(line):
+            yield from (x for x in self.combined if x.pattern.match(line))
+        yield from (x for x in self.separate if x.pattern.match(line))
+
+
+class CaptureEngine:
+    """The captures of an application, prepared once and shared by all of its runs."""
+
+    def __init__(self, captures: list[SpinnerCapture]) -> None:
+        self.captures = captures
+        self.matches = [x for x in captures if isinstance(x, SpinnerCaptureMatches)]
+        self.markers = [x for x in captures if isinstance(x, SpinnerCaptureMarker)]
+        self.keep_output = any(isinstance(x, SpinnerCaptureAll) for x in captures)
+        self.scanners: dict[frozenset[str], MultiPatternScanner] = {}
+
+    def scanner(self, found: Collection[str]) -> MultiPatternScanner:
+        """Return the scanner for the captures whose name is not in `found`."""
+        key = frozenset(found)
+        scanner = self.scanners.get(key)
+        if scanner is None:
+            if len(self.scanners) >= MAX_SCANNERS:
+                self.scanners.clear()
+            scanner = MultiPatternScanner(
+                [x for x in self.matches if x.name not in key]
+            )
+            self.scanners[key] = scanner
+        return scanner
+
+    def stream(
+        self, *, keep_output: bool = False, keep_tail: int = 0
+    ) -> "CaptureStream":
+        return CaptureStream(self, keep_output=keep_output, keep_tail=keep_tail)
+
+
+class CaptureStream(OutputBuffer):
+    """
+    Evaluate the captures of an application while the output arrives.
+
+    Lines are matched as soon as they are complete and then dropped, so memory use
+    does not depend on how much a process prints. The full output is only stored
+    when `keep_output` is set or when a capture of type `all` needs it. Otherwise,
+    only the last `keep_tail` bytes of `stderr` are kept.
+
+    The result is the same as matching `stdout` and then `stderr` after the process
+    exits: for each capture, the first match in `stdout` wins, and `stderr` is only
+    used if `stdout` has no match. Markers are the exception: they record when the
+    first matching line arrived, from either stream.
+    """
+
+    def __init__(
+        self, engine: CaptureEngine, *, keep_output: bool = False, keep_tail: int = 0
+    ) -> None:
+        super().__init__()
+        self.keep_tail = keep_tail
+        self.encoding = locale.getpreferredencoding(False)
+        self.engine = engine
+        self.keep_output = keep_output or engine.keep_output
+        self.partial = {1: bytearray(), 2: bytearray()}
+        self.found: dict[int, dict[str, Any]] = {1: {}, 2: {}}
+        self.scanners = self.make_scanners()
+        self.markers: dict[str, float] = {}
+        self.pending_markers = list(engine.markers)
+
+    def make_scanners(self) -> dict[int, MultiPatternScanner]:
+        # `stderr` is only needed for the captures that did not match `stdout`.
+        return {
+            1: self.engine.scanner(self.found[1]),
+            2: self.engine.scanner(self.found[1].keys() | self.found[2].keys()),
+        }
+
+    @property
+    def satisfied(self) -> bool:
+        """Whether no capture needs more lines, from any of the streams."""
+        return (
+            not self.scanners[1] and not self.scanners[2] and not self.pending_markers
+        )
+
+    def feed(self, fd: int, data: bytes) -> None:
+        if self.keep_output:
+            super().feed(fd, data)
+        elif self.keep_tail and fd == 2:
+            super().feed(fd, data)
+            del self.output[fd][: -self.keep_tail]
+
+        if not self.scanners[fd] and not self.pending_markers:
+            return
+
+        partial = self.partial[fd]
+        *lines, rest = (partial + data).split(b"\n")
+        partial[:] = rest[:MAX_LINE_LENGTH]
+        if lines and self.pending_markers:
+            self.feed_markers(lines)
+        for line in lines:
+            self.feed_line(fd, line[:MAX_LINE_LENGTH])
+
+    def close(self) -> None:
+        for fd, partial in self.partial.items():
+            if partial and self.pending_markers:
+                self.feed_markers([partial])
+            if partial and self.scanners[fd]:
+                self.feed_line(fd, bytes(partial))
+            partial.clear()
+
+    def feed_markers(self, lines: list[bytes]) -> None:
+        """Record the time of arrival of the markers found in the given lines."""
+        elapsed = (time.perf_counter_ns() - self.start_ns) / 1e9
+        for line in lines:
+            if not self.pending_markers:
+                break
+            decoded = line[:MAX_LINE_LENGTH].decode(self.encoding, errors="replace")
+            pending = []
+            for marker in self.pending_markers:
+                if marker.pattern.match(decoded):
+                    self.markers[marker.name] = elapsed
+                else:
+                    pending.append(marker)
+            self.pending_markers = pending
+
+    def feed_line(self, fd: int, line: bytes) -> None:
+        """Match a complete line of output against the pending captures."""
+        found = self.found[fd]
+        changed = False
+        decoded = line.decode(self.encoding, errors="replace")
+        for text in decoded.splitlines() or [decoded]:
+            for capture in self.scanners[fd].scan(text):
+                if capture.name not in found:
+                    found[capture.name] = capture.func.function(text)
+                    changed = True
+        # Satisfied captures are dropped from the scanners, so that each line is
+        # matched only against the captures that still need a value.
+        if changed:
+            self.scanners = self.make_scanners()
+
+    def results(self) -> dict[str, Any]:
+        """Return the value of every capture, keyed by its name."""
+        results = {}
+        for capture in self.engine.captures:
+            if isinstance(capture, SpinnerCaptureAll):
+                _, value = capture.process("\n".join([self.text(1), self.text(2)]))
+            elif isinstance(capture, SpinnerCaptureMarker):
+                value = self.markers.get(capture.name)
+            else:
+                value = self.found[1].get(capture.name, self.found[2].get(capture.name))
+            results[capture.name] = value
+        return results
@@ -0,0 +1,517 @@
+import asyncio
+import contextlib
+import contextvars
+import os
+import queue
+import socket
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (
+    Client,
+    Connection,
+    Listener,
+    answer_challenge,
+    deliver_challenge,
+    wait,
+)
+from typing import Any, BinaryIO, Iterator
+
+import pandas as pd
+
+from spinner.app import SpinnerApp
+from spinner.runner import InstanceRunner, launcher
+from spinner.runner.progress import RunnerProgress
+from spinner.runner.results import ResultBuffer
+from spinner.runner.sampler import SAMPLE_COLUMNS, ProcessSampler
+from spinner.runner.utilities import (
+    Job,
+    count_jobs,
+    create_runners,
+    job_order,
+    median_overhead,
+    ordered_jobs,
+    result_buffer,
+    run_metadata,
+    select_benchmarks,
+    write_output,
+)
+from spinner.schema import SpinnerConfig
+
+# ==============================================================================
+# GLOBALS
+# ==============================================================================
+
+# Seconds between the messages workers send to show they are still alive.
+HEARTBEAT = 5.0
+
+# Seconds without any message after which a worker is considered dead.
+HEARTBEAT_TIMEOUT = 30.0
+
+# Seconds the coordinator waits for messages before checking on its workers.
+POLL_INTERVAL = 0.5
+
+# Seconds a new connection has to authenticate before it is closed.
+HANDSHAKE_TIMEOUT = 10.0
+
+# ==============================================================================
+# LOCAL FUNCTIONS
+# ==============================================================================
+
+
+def _shutdown(connection: Connection) -> None:
+    """Shut a connection down, waking up any thread blocked reading from it."""
+    with contextlib.suppress(OSError):
+        fd = connection.fileno()
+        with socket.fromfd(fd, socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.shutdown(socket.SHUT_RDWR)
+
+
+def _stop(connection: Connection) -> None:
+    """Tell a worker there are no more jobs, and close its connection."""
+    with contextlib.suppress(OSError):
+        connection.send(("stop",))
+    connection.close()
+
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class JobRows:
+    """
+    Stand-in for a `ResultBuffer` that keeps the rows of each job apart.
+
+    Jobs run concurrently on a worker, so each one sets its own list of rows before
+    running, and rows are indexed within their job.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.current: contextvars.ContextVar[list[dict[str, Any]]] = (
+            contextvars.ContextVar(name)
+        )
+
+    def append(self, row: dict[str, Any]) -> int:
+        rows = self.current.get()
+        rows.append(row)
+        return len(rows) - 1
+
+
+class WorkerState:
+    """What the coordinator knows about a connected worker."""
+
+    def __init__(self, connection: Connection) -> None:
+        self.connection = connection
+        self.info: dict[str, Any] = {}
+        self.slots = 0
+        self.assigned: dict[int, Job] = {}
+        self.completed = 0
+        self.last_seen = time.monotonic()
+
+    @property
+    def name(self) -> str:
+        return f"{self.info.get('hostname', '?')}:{self.info.get('pid', '?')}"
+
+
+class Coordinator:
+    """
+    Hand the jobs of a configuration out to workers, and collect their results.
+
+    Workers connect at any time, receive the configuration, and are then kept busy
+    with as many jobs as they have slots. Jobs are sent in the order given by
+    `metadata.order`. Jobs of workers that disconnect, or that stop sending heartbeats,
+    are given to the other workers. All runs of a point that depend on each other
+    (see `InstanceRunner.jobs`) are a single job, but `monotonic` pruning and
+    adaptive timeouts only use what each worker has seen.
+    """
+
+    def __init__(
+        self,
+        app: SpinnerApp,
+        config: SpinnerConfig,
+        address: tuple[str, int],
+        authkey: bytes,
+        benchmark: str | None = None,
+        extra_args: dict[str, Any] | None = None,
+    ) -> None:
+        self.app = app
+        self.config = config
+        self.benchmark = benchmark
+        self.extra = extra_args or {}
+        self.authkey = authkey
+        # Connections are authenticated separately, so that a client that never
+        # completes the handshake does not keep others from connecting.
+        self.listener = Listener(address)
+        # Set once all jobs are done, after which new workers are sent away.
+        self.closed = False
+        self.lock = threading.Lock()
+        self.connected: queue.SimpleQueue[Connection] = queue.SimpleQueue()
+        self.workers: dict[Connection, WorkerState] = {}
+        self.retired: list[WorkerState] = []
+        # Jobs taken from `jobs` or requeued, waiting for a worker.
+        self.pending: deque[Job] = deque()
+        self.jobs: Iterator[Job] = iter(())
+        self.next_id = 0
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self.listener.address
+
+    def accept(self) -> None:
+        """Accept workers until the listener is closed."""
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                if self.closed:
+                    return
+                continue
+            threading.Thread(
+                target=self.handshake, args=(connection,), daemon=True
+            ).start()
+
+    def handshake(self, connection: Connection) -> None:
+        """Authenticate a new connection and send it the configuration."""
+        timer = threading.Timer(HANDSHAKE_TIMEOUT, _shutdown, (connection,))
+        timer.start()
+        try:
+            deliver_challenge(connection, self.authkey)
+            answer_challenge(connection, self.authkey)
+            connection.send(("config", self.config, self.benchmark, self.extra))
+        except (AuthenticationError, EOFError, OSError) as error:
+            self.app.warning(f"Rejected a connection: {error or 'closed'}")
+            connection.close()
+            return
+        finally:
+            timer.cancel()
+        with self.lock:
+            if not self.closed:
+                self.connected.put(connection)
+                return
+        # All jobs are done already.
+        _stop(connection)
+
+    def has_jobs(self) -> bool:
+        if not self.pending and (job := next(self.jobs, None)) is not None:
+            self.pending.append(job)
+        return bool(self.pending)
+
+    def assign(self, worker: WorkerState) -> None:
+        """Send jobs to a worker until all its slots are busy."""
+        while len(worker.assigned) < worker.slots and self.has_jobs():
+            job = self.pending.popleft()
+            runner, idx, command, parameters = job
+            key = (runner.benchmark_name, runner.application_name)
+            try:
+                worker.connection.send(
+                    ("job", self.next_id, key, idx, command, parameters)
+                )
+            except OSError:
+                self.pending.appendleft(job)
+                self.drop(worker, "disconnected")
+                return
+            worker.assigned[self.next_id] = job
+            self.next_id += 1
+
+    def drop(self, worker: WorkerState, reason: str) -> None:
+        """Forget a worker, giving its jobs to others."""
+        del self.workers[worker.connection]
+        worker.connection.close()
+        self.pending.extendleft(reversed(worker.assigned.values()))
+        self.app.warning(
+            f"Worker {worker.name} {reason}, requeued {len(worker.assigned)} jobs."
+        )
+        worker.assigned.clear()
+        self.retired.append(worker)
+
+    def receive(
+        self,
+        worker: WorkerState,
+        results: ResultBuffer,
+        samples: ResultBuffer | None,
+        progress: RunnerProgress,
+    ) -> None:
+        """Handle the next message of a worker."""
+        try:
+            message = worker.connection.recv()
+        except (EOFError, OSError):
+            self.drop(worker, "disconnected")
+            return
+        worker.last_seen = time.monotonic()
+
+        if message[0] == "hello":
+            worker.info = message[1]
+            worker.slots = worker.info["slots"]
+            self.app.print(f"Worker {worker.name} joined ({worker.slots} slots).")
+        elif message[0] == "result":
+            _, job_id, rows, job_samples = message
+            _, idx, _, _ = worker.assigned.pop(job_id)
+            worker.completed += 1
+            indices = [results.append(row) for row in rows]
+            if samples is not None:
+                for sample in job_samples:
+                    samples.append({**sample, "row": indices[sample["row"]]})
+            # All runs of a point are done, whether they ran or were skipped.
+            steps = self.config.metadata.runs_per_point if idx is None else 1
+            progress.advance(progress.task, steps)
+        elif message[0] == "error":
+            _, job_id, error = message
+            runner, idx, _, parameters = worker.assigned.pop(job_id)
+            self.app.warning(f"Worker {worker.name} failed to run a job:\n{error}")
+            # Like a run that failed, each run of the job is a `failed` row, up to
+            # the minimum number of runs of a point.
+            min_runs, _ = self.config.metadata.run_limits()
+            row = {"name": runner.application_name, **parameters, "status": "failed"}
+            for _ in range(min_runs if idx is None else 1):
+                results.append(row)
+            steps = self.config.metadata.runs_per_point if idx is None else 1
+            progress.advance(progress.task, steps)
+
+    def run(self, output: BinaryIO) -> None:
+        """Serve all jobs, then write the results to `output` like `run_benchmarks`."""
+        config = self.config
+        results = result_buffer(config)
+        samples = None
+        if config.metadata.sampler is not None:
+            samples = ResultBuffer(["row", *SAMPLE_COLUMNS])
+
+        start_ts = pd.Timestamp.now()
+        start_env = config.metadata.capture_environment()
+
+        order, seed = job_order(config)
+        benchmark_items = select_benchmarks(config, self.benchmark)
+        total_jobs = count_jobs(config, benchmark_items, self.extra)
+
+        host, port = self.address
+        self.app.print(f"Waiting for workers on {host}:{port}.")
+        threading.Thread(target=self.accept, daemon=True).start()
+
+        try:
+            with RunnerProgress(self.app, config, total=total_jobs) as progress:
+                # Runners are only used to list the jobs.
+                runners = create_runners(
+                    self.app,
+                    config,
+                    benchmark_items,
+                    self.extra,
+                    results=results,
+                    progress=progress,
+                )
+                self.jobs = ordered_jobs(runners, order, config.metadata.runs, seed)
+
+                while True:
+                    while not self.connected.empty():
+                        connection = self.connected.get()
+                        self.workers[connection] = WorkerState(connection)
+
+                    for worker in list(self.workers.values()):
+                        self.assign(worker)
+
+                    busy = any(worker.assigned for worker in self.workers.values())
+                    if not busy and not self.has_jobs():
+                        break
+
+                    for connection in wait(list(self.workers), timeout=POLL_INTERVAL):
+                        self.receive(
+                            self.workers[connection], results, samples, progress
+                        )
+
+                    now = time.monotonic()
+                    for worker in list(self.workers.values()):
+                        if now - worker.last_seen > HEARTBEAT_TIMEOUT:
+                            self.drop(worker, "stopped responding")
+        finally:
+            with self.lock:
+                self.closed = True
+            self.listener.close()
+            while not self.connected.empty():
+                _stop(self.connected.get())
+            for worker in list(self.workers.values()):
+                _stop(worker.connection)
+                self.retired.append(worker)
+
+        df = results.to_frame()
+        self.app.print(df)
+
+        # Every failed run is a row, so failures are counted from them.
+        failures = Counter(
+            status
+            for status in df["status"]
+            if status in ("timeout", "failed", "limit")
+        )
+        workers = [
+            {**worker.info, "completed": worker.completed} for worker in self.retired
+        ]
+
+        metadata = run_metadata(
+            config,
+            start_ts,
+            start_env,
+            self.benchmark,
+            self.extra,
+            parallelism=sum(worker.get("slots", 0) for worker in workers),
+            order=order,
+            seed=seed,
+            # Measured on each worker, see `workers`.
+            launch_overhead=None,
+            failures=failures,
+            workers=workers,
+        )
+        write_output(output, config, metadata, df, samples)
+
+
+class Worker:
+    """Run the jobs sent by a coordinator, sending back their results."""
+
+    def __init__(
+        self, app: SpinnerApp, connection: Connection, jobs: int | None = None
+    ) -> None:
+        self.app = app
+        self.connection = connection
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.rows = JobRows("rows")
+        self.samples = JobRows("samples")
+
+    def send(self, message: tuple) -> None:
+        with self.lock:
+            self.connection.send(message)
+
+    def recv(self) -> tuple:
+        try:
+            return self.connection.recv()
+        except (EOFError, OSError):
+            return ("stop",)
+
+    def heartbeat(self, stopped: threading.Event) -> None:
+        while not stopped.wait(HEARTBEAT):
+            try:
+                self.send(("alive",))
+            except OSError:
+                return
+
+    async def run_job(
+        self,
+        runner: InstanceRunner,
+        job_id: int,
+        idx: int | None,
+        command: str,
+        parameters: dict[str, Any],
+    ) -> None:
+        rows, samples = [], []
+        self.rows.current.set(rows)
+        self.samples.current.set(samples)
+        try:
+            await runner.run_job(idx, command, parameters)
+        except Exception:
+            self.send(("error", job_id, traceback.format_exc()))
+            return
+        self.send(("result", job_id, rows, samples))
+
+    async def serve(self) -> None:
+        message = self.recv()
+        if message[0] == "stop":
+            return
+        _, config, benchmark, extra = message
+        loop = asyncio.get_running_loop()
+
+        launch_overhead = overhead = None
+        if config.metadata.calibration:
+            launch_overhead = await launcher.calibrate(config.metadata.calibration)
+            overhead = median_overhead(launch_overhead)
+
+        sampler = None
+        if config.metadata.sampler is not None:
+            sampler = ProcessSampler(
+                config.metadata.sampler.interval, config.metadata.sampler.max_samples
+            )
+
+        slots = self.jobs or config.metadata.parallelism
+        tasks: set[asyncio.Task] = set()
+        stopped = threading.Event()
+
+        with (
+            RunnerProgress(self.app, config, disable=True) as progress,
+            sampler or contextlib.nullcontext(),
+        ):
+            runners = create_runners(
+                self.app,
+                config,
+                select_benchmarks(config, benchmark),
+                extra,
+                results=self.rows,
+                progress=progress,
+                sampler=sampler,
+                samples=self.samples if sampler is not None else None,
+                launch_overhead=overhead,
+            )
+            self.send(
+                (
+                    "hello",
+                    {
+                        "hostname": os.uname().nodename,
+                        "pid": os.getpid(),
+                        "slots": slots,
+                        "launch_overhead": launch_overhead,
+                    },
+                )
+            )
+            threading.Thread(
+                target=self.heartbeat, args=(stopped,), daemon=True
+            ).start()
+
+            runners_by_key = {
+                (runner.benchmark_name, runner.application_name): runner
+                for runner in runners
+            }
+
+            try:
+                while True:
+                    message = await loop.run_in_executor(None, self.recv)
+                    if message[0] == "stop":
+                        break
+                    _, job_id, key, idx, command, parameters = message
+                    task = asyncio.create_task(
+                        self.run_job(
+                            runners_by_key[key], job_id, idx, command, parameters
+                        )
+                    )
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            finally:
+                stopped.set()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ==============================================================================
+# PUBLIC FUNCTIONS
+# ==============================================================================
+
+
+def serve(
+    app: SpinnerApp,
+    config: SpinnerConfig,
+    output: BinaryIO,
+    address: tuple[str, int],
+    authkey: bytes,
+    benchmark: str | None = None,
+    extra_args: dict[str, Any] | None = None,
+) -> None:
+    """Run all benchmarks on the workers that connect to `address`."""
+    Coordinator(app, config, address, authkey, benchmark, extra_args).run(output)
+
+
+def run_worker(
+    app: SpinnerApp,
+    address: tuple[str, int],
+    authkey: bytes,
+    jobs: int | None = None,
+) -> None:
+    """Connect to a coordinator and run jobs until there are none left."""
+    with Client(address, authkey=authkey) as connection:
+        asyncio.run(Worker(app, connection, jobs).serve())
@@ -1,13 +1,21 @@
-import subprocess as sp
-import time
-from typing import Any
+import math
+from collections import Counter
+from typing import Any, Container, Iterable, Iterator
 
-import pandas as pd
 from jinja2 import Environment, Undefined
 from jinja2.exceptions import UndefinedError
 
 from spinner.app import SpinnerApp
+from spinner.runner import launcher
+from spinner.runner.cache import ResultCache
+from spinner.runner.capture import CaptureEngine, CaptureStream
+from spinner.runner.journal import JobKey, ResultJournal, job_key
+from spinner.runner.limits import STDERR_TAIL, limit_breached, resource_limits
 from spinner.runner.progress import RunnerProgress
+from spinner.runner.results import ResultBuffer
+from spinner.runner.sampler import ProcessSampler
+from spinner.runner.stopping import relative_ci
+from spinner.runner.timeouts import TimeoutEstimator
 from spinner.schema import SpinnerApplication, SpinnerBenchmark, SpinnerConfig
 
 
@@ -30,9 +38,16 @@ class InstanceRunner:
     benchmark_name: str
     application_name: str
     benchmark: SpinnerBenchmark
-    dataframe: pd.DataFrame
+    results: ResultBuffer
     application: SpinnerApplication
     extra_args: dict[str, str] | None
+    journal: ResultJournal | None
+    cache: ResultCache | None
+    sampler: ProcessSampler | None
+    samples: ResultBuffer | None
+    launch_overhead: dict[str, int] | None
+    failures: Counter[str] | None
+    points: Container[int] | None
 
     def __init__(
         self,
@@ -42,44 +57,178 @@ class InstanceRunner:
         benchmark_name: str,
         application_name: str,
         benchmark: SpinnerBenchmark,
-        dataframe: pd.DataFrame,
+        results: ResultBuffer,
         progress: RunnerProgress,
         extra_args: dict[str, str] | None = None,
+        journal: ResultJournal | None = None,
+        cache: ResultCache | None = None,
+        sampler: ProcessSampler | None = None,
+        samples: ResultBuffer | None = None,
+        launch_overhead: dict[str, int] | None = None,
+        failures: Counter[str] | None = None,
+        points: Container[int] | None = None,
     ) -> None:
         self.app = app
         self.config = config
         self.benchmark_name = benchmark_name
         self.application_name = application_name
         self.benchmark = benchmark
-        self.dataframe = dataframe
+        self.results = results
         self.progress = progress
         self.application = config.applications[application_name]
         self.environment = Environment(undefined=StrictUndefined)
+        self.template = self.application.command.template(self.environment)
+        self.captures = CaptureEngine(self.application.capture)
         self.extra_args = extra_args
+        self.journal = journal
+        self.cache = cache
+        self.sampler = sampler
+        self.samples = samples
+        self.launch_overhead = launch_overhead
+        self.failures = failures
+        self.points = points
+        # Points that failed, whose dominated points (see `monotonic`) are skipped.
+        self.failed_points: list[dict[str, Any]] = []
+        self.timeouts = None
+        if (adaptive := config.metadata.adaptive_timeout) is not None:
+            self.timeouts = TimeoutEstimator(
+                adaptive.factor, adaptive.minimum, config.metadata.timeout
+            )
+        limits = self.application.limits
+        self.rlimits = resource_limits(limits) if limits is not None else None
+        self.application_spec = self.application.model_dump_json()
 
-    def run(self) -> None:
+    async def run(self) -> None:
         """Sweep the benchmark parameters and execute each combination."""
         for parameters in self.benchmark.sweep_parameters(self.extra_args):
-            self.run_with_parameters(parameters)
+            await self.run_with_parameters(parameters)
 
-    def run_with_parameters(self, parameters: dict[str, Any]) -> None:
-        """Run benchmark with a single combination of parameters."""
-        timeout = self.config.metadata.timeout
-        retry = self.config.metadata.retry
+    def jobs(
+        self, runs: Iterable[int] | None = None
+    ) -> Iterator[tuple[int | None, str, dict[str, Any]]]:
+        """
+        Yield the run index, command and parameters of every job.
+
+        Only the given run indices are yielded, if any, and only of the given
+        `points` (by their position in the sweep). With warmup runs or adaptive
+        repetition, the runs of a point depend on each other, so a single job without
+        a run index is yielded for all of them.
+        """
+        metadata = self.config.metadata
+        sweep = self.benchmark.sweep_parameters(self.extra_args)
+        for point, parameters in enumerate(sweep):
+            if self.points is not None and point not in self.points:
+                continue
+            try:
+                command = self.template.render(**parameters)
+            except UndefinedError as e:
+                self.app.fatal(f"Application {self.application_name}: {e}.")
+                continue
+
+            if metadata.warmup or metadata.adaptive:
+                yield None, command, parameters
+                continue
+
+            for i in range(metadata.runs) if runs is None else runs:
+                if self.completed(i, parameters):
+                    continue
+                yield i, command, parameters
+
+    async def run_job(
+        self, idx: int | None, command: str, parameters: dict[str, Any]
+    ) -> None:
+        """Run a single job yielded by `jobs`."""
+        if idx is None:
+            await self.repeat(command, parameters)
+            return
+        if self.dominated(parameters):
+            self.censor(idx, parameters)
+            return
+        await self.run_command(
+            idx,
+            command,
+            parameters,
+            timeout=self.timeout(parameters),
+            retry=self.config.metadata.retry,
+        )
 
+    async def run_with_parameters(self, parameters: dict[str, Any]) -> None:
+        """Run benchmark with a single combination of parameters."""
         try:
-            command = self.application.render(self.environment, **parameters)
+            command = self.template.render(**parameters)
         except UndefinedError as e:
             self.app.fatal(f"Application {self.application_name}: {e}.")
             return
 
-        # Run the command once, for each run.
-        for i in range(self.config.metadata.runs):
-            self.run_command(
-                i, command, parameters, timeout=timeout, retry=retry
+        await self.repeat(command, parameters)
+
+    async def repeat(self, command: str, parameters: dict[str, Any]) -> None:
+        """
+        Run a point after its warmup runs, until enough runs are measured.
+
+        With `target_rel_ci`, runs stop once the confidence interval of the mean of
+        `ci_metric` is tight enough (after `min_runs`, up to `max_runs`). Steps of
+        the progress bar for runs that are not needed are removed from its total.
+
+        Once the point is dominated by a failed one, each remaining run is censored,
+        up to `min_runs` (or just the next run, if there were already that many).
+        """
+        metadata = self.config.metadata
+        min_runs, max_runs = metadata.run_limits()
+        warmup = metadata.warmup
+        measured: list[float] = []
+
+        runs = 0
+        while runs < max_runs:
+            if self.dominated(parameters):
+                for idx in range(runs, max(min_runs, runs + 1)):
+                    self.censor(idx, parameters)
+                runs = max(min_runs, runs + 1)
+                break
+            if (
+                metadata.adaptive
+                and len(measured) >= min_runs
+                and relative_ci(measured, metadata.confidence) <= metadata.target_rel_ci
+            ):
+                break
+
+            if self.completed(runs, parameters):
+                values = self.journal.completed[self.job_key(runs, parameters)]
+            else:
+                if warmup:
+                    await self.warmup(command, parameters, warmup)
+                    warmup = 0
+                values = await self.run_command(
+                    runs,
+                    command,
+                    parameters,
+                    timeout=self.timeout(parameters),
+                    retry=metadata.retry,
+                )
+            runs += 1
+
+            value = (values or {}).get(metadata.ci_metric)
+            if isinstance(value, (int, float)) and not math.isnan(value):
+                measured.append(value)
+
+        self.progress.skip(max_runs - runs + warmup)
+
+    async def warmup(self, command: str, parameters: dict[str, Any], runs: int) -> None:
+        """Run a command without recording its results."""
+        for i in range(runs):
+            self.app.vprint(f"warmup {i}: $ {command}")
+            await self.launch_process_with_retry(
+                command, self.timeout(parameters), self.config.metadata.retry
             )
+            self.progress.step()
 
-    def run_command(
+    def timeout(self, parameters: dict[str, Any]) -> float | None:
+        """Return the timeout of the next run of a point."""
+        if self.timeouts is None:
+            return self.config.metadata.timeout
+        return self.timeouts.timeout(parameters)
+
+    async def run_command(
         self,
         idx: int,
         command: str,
@@ -87,113 +236,195 @@ class InstanceRunner:
         *,
         timeout: float | None = None,
         retry: int | None = None,
-    ) -> None:
-        """Run a command and capture its output."""
+    ) -> dict[str, Any] | None:
+        """Run a command, returning its results unless it failed."""
         self.app.vprint(f"run {idx}: $ {command}")
-        stdout, stderr, retcode, elapsed, timed_out = self.launch_process_with_retry(
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(
+                command, self.application_spec, idx, self.application.inputs
+            )
+            if (entry := self.cache.get(cache_key)) is not None:
+                self.app.vprint(f"run {idx}: cached result")
+                self.app.vvprint(entry["stdout"])
+                self.app.vvprint(entry["stderr"])
+                self.add_result(idx, parameters, entry["values"])
+                return entry["values"]
+
+        output, result, failure, attempts = await self.launch_process_with_retry(
             command, timeout, retry
         )
 
-        self.app.vvprint(stdout)
-        self.app.vvprint(stderr)
-        self.app.vvprint(f"return code: {retcode}")
+        self.app.vvprint(output.text(1))
+        self.app.vvprint(output.text(2))
+        self.app.vvprint(f"return code: {result.returncode}")
+
+        values = {
+            **output.results(),
+            "time": result.elapsed,
+            "time_ns": result.elapsed_ns,
+            "attempts": attempts,
+            "returncode": None if failure == "timeout" else result.returncode,
+        }
+        if self.timeouts is not None:
+            values["effective_timeout"] = timeout
 
-        if timed_out or not self.config.metadata.is_success(retcode):
+        # Failed runs are kept as rows, but never measured nor cached.
+        if failure is not None:
             self.app.error("Failed to run command.")
-            return
+            if self.failures is not None:
+                self.failures[failure] += 1
+            if self.benchmark.monotonic:
+                self.failed_points.append(parameters)
+            self.add_result(idx, parameters, values, status=failure)
+            return None
 
-        output = "\n".join([stdout, stderr])
-        captures = self.process_captures(output)
+        if self.launch_overhead is not None and result.elapsed_ns is not None:
+            # Commands with limits are started through the shell (see `execute`).
+            shell = self.application.shell or bool(self.rlimits)
+            mode = "shell" if shell else "exec"
+            overhead = self.launch_overhead[mode]
+            values["time_corrected"] = max(result.elapsed_ns - overhead, 0) / 1e9
+        if self.config.metadata.rusage:
+            values.update(result.rusage_columns())
 
-        self.dataframe.loc[len(self.dataframe)] = {
-            "name": self.application_name,
-            **parameters,
-            **captures,
-            "time": elapsed,
-        }
+        if cache_key is not None:
+            self.cache.put(
+                cache_key,
+                {"stdout": output.text(1), "stderr": output.text(2), "values": values},
+            )
+
+        index = self.add_result(idx, parameters, values)
+
+        if self.samples is not None and result.samples is not None:
+            for sample in result.samples.rows(index):
+                self.samples.append(sample)
+
+        return values
+
+    def add_result(
+        self,
+        idx: int,
+        parameters: dict[str, Any],
+        values: dict[str, Any],
+        status: str = "ok",
+    ) -> int:
+        """Store the result of a job, advance the progress bar and return its row."""
+        row = {"name": self.application_name, **parameters, **values, "status": status}
+        index = self.results.append(row)
+        if self.timeouts is not None and status == "ok" and "time" in values:
+            self.timeouts.observe(parameters, values["time"])
+        # Failed jobs are not journaled, so that resuming runs them again.
+        if self.journal is not None and status in ("ok", "censored"):
+            self.journal.append(self.job_key(idx, parameters), row)
+
+        self.progress.step()
+        return index
+
+    def dominated(self, parameters: dict[str, Any]) -> bool:
+        """Whether a point is at least as slow as one that already failed."""
+        return any(
+            self.benchmark.dominates(point, parameters) for point in self.failed_points
+        )
+
+    def censor(self, idx: int, parameters: dict[str, Any]) -> None:
+        """Record a job skipped because a point it dominates failed."""
+        self.app.vprint(f"run {idx}: skipped, a smaller point failed")
+        self.add_result(idx, parameters, {}, status="censored")
+
+    def job_key(self, idx: int, parameters: dict[str, Any]) -> JobKey:
+        return job_key(self.benchmark_name, self.application_name, parameters, idx)
 
+    def completed(self, idx: int, parameters: dict[str, Any]) -> bool:
+        """Whether the job was completed by a previous (resumed) run."""
+        if self.journal is None or self.job_key(idx, parameters) not in self.journal:
+            return False
         self.progress.step()
+        return True
 
-    def launch_process_with_retry(
+    async def launch_process_with_retry(
         self,
         command: str,
         timeout: float | None = None,
         retry: int | None = None,
-    ) -> tuple[str, str, int, float, bool]:
-        """Launch a process, retrying in case of failure."""
+    ) -> tuple[CaptureStream, launcher.ProcessOutput, str | None, int]:
+        """
+        Launch a process, retrying in case of failure.
+
+        Also returns why the last attempt failed (`timeout`, `limit` or `failed`),
+        or None if it succeeded, and how many attempts were made. Exceeding a
+        resource limit is not retried, since it would most likely happen again.
+        """
         remaining_tries = retry or 1
         attempt = 0
 
         while remaining_tries > 0:
             attempt += 1
             timed_out = False
+            output = self.capture_stream()
             try:
-                process, elapsed = self.execute_process_with_timeout(command, timeout)
-                stdout = process.stdout
-                stderr = process.stderr
-                returncode = process.returncode
-            except sp.TimeoutExpired:
+                result = await self.execute_process_with_timeout(
+                    command, timeout, output
+                )
+            except TimeoutError:
                 timed_out = True
-                stdout = ""
-                stderr = f"Timeout error: (limit: {timeout}s)"
-                returncode = -1
-                elapsed = float(timeout)
+                result = launcher.ProcessOutput("", "", -1, float(timeout))
+            returncode = result.returncode
 
             success = self.config.metadata.is_success(returncode)
             if success and not timed_out:
-                break
+                return (output, result, None, attempt)
+
+            limits = self.application.limits
+            if not timed_out and limits is not None:
+                limit = limit_breached(limits, result, output.text(2))
+                if limit is not None:
+                    self.app.error(
+                        f"Attempt {attempt} exceeded the {limit} limit. Not retrying."
+                    )
+                    return (output, result, "limit", attempt)
 
             remaining_tries -= 1
             if remaining_tries > 0:
                 if timed_out:
-                    self.app.vprint(
-                        f"Attempt {attempt} timed out. Retrying..."
-                    )
+                    self.app.vprint(f"Attempt {attempt} timed out. Retrying...")
                 else:
                     self.app.vprint(
                         f"Attempt {attempt} failed with code {returncode}. Retrying..."
                     )
             else:
                 if timed_out:
-                    self.app.error(
-                        f"Attempt {attempt} timed out. No retries left."
-                    )
+                    self.app.error(f"Attempt {attempt} timed out. No retries left.")
                 else:
                     self.app.error(
                         f"Attempt {attempt} failed with code {returncode}. No retries left."
                     )
 
-        return (stdout, stderr, returncode, elapsed, timed_out)
+        return (output, result, "timeout" if timed_out else "failed", attempt)
 
-    def execute_process_with_timeout(
-        self, command: str, timeout: float | None = None
-    ) -> tuple[sp.Popen, float]:
+    async def execute_process_with_timeout(
+        self,
+        command: str,
+        timeout: float | None = None,
+        output: launcher.OutputBuffer | None = None,
+    ) -> launcher.ProcessOutput:
         """Execute a process and wait for it to finish or reach the timeout."""
-        t = time.monotonic()
-
-        process = sp.Popen(
+        return await launcher.execute(
             command,
-            shell=True,
-            stdout=sp.PIPE,
-            stderr=sp.PIPE,
-            start_new_session=True,
-            text=True,
+            timeout,
+            output,
+            self.sampler,
+            shell=self.application.shell,
+            env=self.application.env,
+            rlimits=self.rlimits,
         )
 
-        try:
-            stdout, stderr = process.communicate(timeout=timeout)
-            process.stdout = stdout
-            process.stderr = stderr
-        except sp.TimeoutExpired as err:
-            process.kill()
-            raise err
-
-        elapsed = time.monotonic() - t
-        return process, elapsed
-
-    def process_captures(self, stdout: str) -> dict[str, str]:
-        captures = {}
-        for capture in self.application.capture:
-            key, value = capture.process(stdout)
-            captures[key] = value
-        return captures
+    def capture_stream(self) -> CaptureStream:
+        """Create the stream that evaluates the captures of a single attempt."""
+        # The raw output is only kept when it is going to be logged.
+        # The tail of `stderr` tells why a command with limits failed.
+        return self.captures.stream(
+            keep_output=self.app.verbosity >= 2,
+            keep_tail=STDERR_TAIL if self.application.limits is not None else 0,
+        )
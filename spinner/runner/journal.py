@@ -0,0 +1,158 @@
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any
+
+from spinner.schema import SpinnerConfig
+
+# ==============================================================================
+# TYPES
+# ==============================================================================
+
+# Identifies a single job: (benchmark, application, parameters, run index).
+JobKey = tuple[str, str, str, int]
+
+# ==============================================================================
+# PUBLIC FUNCTIONS
+# ==============================================================================
+
+
+def job_key(
+    benchmark_name: str, application_name: str, parameters: dict[str, Any], idx: int
+) -> JobKey:
+    """Return a hashable key identifying a job."""
+    return (benchmark_name, application_name, repr(sorted(parameters.items())), idx)
+
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class JournalError(Exception):
+    """Raised when a journal cannot be used to resume a run."""
+
+
+class ResultJournal:
+    """
+    Append-only, crash-safe log of the results of completed jobs.
+
+    Records are pickled one after the other. Each record is flushed to the OS as soon
+    as it is written, so it survives the runner being killed, and the file is synced
+    to disk every `sync_every` records or `sync_interval` seconds. A truncated record
+    at the end of the file (e.g. after a power loss) is discarded when resuming.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        config: SpinnerConfig,
+        *,
+        benchmark: str | None = None,
+        shard: tuple[int, int] | None = None,
+        extra: dict[str, Any] | None = None,
+        sync_every: int = 64,
+        sync_interval: float = 5.0,
+    ) -> None:
+        self.path = Path(path)
+        # What was run, so that the rows of different runs are never mixed.
+        self.header = {
+            "config": config.fingerprint,
+            "benchmark": benchmark,
+            "shard": shard,
+            "extra": repr(extra or {}),
+        }
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.completed: dict[JobKey, dict[str, Any]] = {}
+        self.file = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def __contains__(self, key: JobKey) -> bool:
+        return key in self.completed
+
+    def __enter__(self) -> "ResultJournal":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def open(self, *, resume: bool = False) -> list[dict[str, Any]]:
+        """
+        Open the journal for writing, returning the rows of previous runs.
+
+        Unless `resume` is set, any previous journal is discarded.
+        """
+        rows = []
+        if resume and self.path.exists():
+            rows, offset = self.load()
+            self.file = open(self.path, "r+b")
+            self.file.truncate(offset)
+            self.file.seek(offset)
+        else:
+            self.file = open(self.path, "wb")
+            self.write(self.header)
+            self.sync()
+        return rows
+
+    def load(self) -> tuple[list[dict[str, Any]], int]:
+        """Read all complete records, returning their rows and where they end."""
+        rows = []
+        with open(self.path, "rb") as f:
+            try:
+                header = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError) as error:
+                raise JournalError(f"{self.path} is not a journal") from error
+            if not isinstance(header, dict):
+                raise JournalError(f"{self.path} is not a journal")
+            for key, what in (
+                ("config", "config"),
+                ("benchmark", "benchmark"),
+                ("shard", "shard"),
+                ("extra", "extra args"),
+            ):
+                if header.get(key) != self.header[key]:
+                    raise JournalError(
+                        f"{self.path} was written for a different {what}"
+                    )
+            offset = f.tell()
+            while True:
+                try:
+                    key, row = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError, ValueError):
+                    break
+                self.completed[key] = row
+                rows.append(row)
+                offset = f.tell()
+        return rows, offset
+
+    def append(self, key: JobKey, row: dict[str, Any]) -> None:
+        """Record the result of a completed job."""
+        self.completed[key] = row
+        self.write((key, row))
+        self.unsynced += 1
+        elapsed = time.monotonic() - self.last_sync
+        if self.unsynced >= self.sync_every or elapsed >= self.sync_interval:
+            self.sync()
+
+    def write(self, record: Any) -> None:
+        pickle.dump(record, self.file)
+        self.file.flush()
+
+    def sync(self) -> None:
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def remove(self) -> None:
+        """Close and delete the journal, once the results are safely stored."""
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,346 @@
+import asyncio
+import locale
+import logging
+import os
+import resource
+import shlex
+import signal
+import subprocess as sp
+import time
+from typing import NamedTuple
+
+from spinner.runner.sampler import ProcessSampler, SampleSeries, read_stat
+
+# ==============================================================================
+# GLOBALS
+# ==============================================================================
+
+logger = logging.getLogger("spinner")
+
+# Seconds leftover processes have to exit after SIGTERM, before they get SIGKILL.
+KILL_GRACE = 1.0
+
+# Launches of `true` used to estimate the cost of starting a process.
+CALIBRATION_RUNS = 20
+
+# Fields of the resource usage reported by `wait4`, stored as result columns.
+RUSAGE_FIELDS = (
+    "ru_utime",  # user CPU time (s)
+    "ru_stime",  # system CPU time (s)
+    "ru_maxrss",  # maximum resident set size (KiB)
+    "ru_minflt",  # page faults without I/O
+    "ru_majflt",  # page faults with I/O
+    "ru_nvcsw",  # voluntary context switches
+    "ru_nivcsw",  # involuntary context switches
+)
+
+# `ulimit` option setting each resource limit, and the unit of its values.
+_ULIMIT_OPTIONS = {
+    resource.RLIMIT_AS: ("-v", 1024),
+    resource.RLIMIT_CPU: ("-t", 1),
+    resource.RLIMIT_NOFILE: ("-n", 1),
+    resource.RLIMIT_CORE: ("-c", 512),
+}
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class ProcessOutput(NamedTuple):
+    """Everything collected from a finished process."""
+
+    stdout: str
+    stderr: str
+    returncode: int
+    elapsed: float
+    elapsed_ns: int | None = None
+    rusage: resource.struct_rusage | None = None
+    samples: SampleSeries | None = None
+
+    def rusage_columns(self) -> dict[str, float | int | None]:
+        """Return the resource usage of the process as result columns."""
+        return {field: getattr(self.rusage, field, None) for field in RUSAGE_FIELDS}
+
+
+class OutputBuffer:
+    """Store everything a process writes to `stdout` (fd 1) and `stderr` (fd 2)."""
+
+    def __init__(self) -> None:
+        self.output = {1: bytearray(), 2: bytearray()}
+        self.start_ns = time.perf_counter_ns()
+
+    def start(self, start_ns: int) -> None:
+        """Called when the process is spawned, with its `perf_counter_ns` time."""
+        self.start_ns = start_ns
+
+    def feed(self, fd: int, data: bytes) -> None:
+        self.output[fd].extend(data)
+
+    def close(self) -> None:
+        """Called once no more output will be fed."""
+
+    def text(self, fd: int) -> str:
+        encoding = locale.getpreferredencoding(False)
+        return self.output[fd].decode(encoding, errors="replace")
+
+
+class PipeProtocol(asyncio.Protocol):
+    """Forward what is read from one of the pipes of a child process."""
+
+    def __init__(self, fd: int, output: OutputBuffer, closed: asyncio.Future) -> None:
+        self.fd = fd
+        self.output = output
+        self.closed = closed
+
+    def data_received(self, data: bytes) -> None:
+        self.output.feed(self.fd, data)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+
+# ==============================================================================
+# LOCAL FUNCTIONS
+# ==============================================================================
+
+
+def _reap(pid: int) -> tuple[int, resource.struct_rusage, int]:
+    _, status, rusage = os.wait4(pid, 0)
+    return status, rusage, time.perf_counter_ns()
+
+
+async def _wait4(pid: int) -> tuple[int, resource.struct_rusage, int]:
+    """
+    Reap a child process without blocking the loop.
+
+    Returns its exit status, its rusage and when its exit was noticed (in
+    `perf_counter_ns` time).
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        # No pidfd support (e.g. old kernels): block on a worker thread instead.
+        return await loop.run_in_executor(None, _reap, pid)
+
+    exited = loop.create_future()
+
+    def notice_exit() -> None:
+        if not exited.done():
+            exited.set_result(time.perf_counter_ns())
+
+    loop.add_reader(pidfd, notice_exit)
+    try:
+        exit_ns = await exited
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+
+    _, status, rusage = os.wait4(pid, 0)
+    return status, rusage, exit_ns
+
+
+def _ulimit(rlimits: list[tuple[int, tuple[int, int]]]) -> str:
+    """Return the shell commands applying the given `setrlimit` arguments."""
+    commands = []
+    for rlimit, limits in rlimits:
+        option, unit = _ULIMIT_OPTIONS[rlimit]
+        # The soft limit goes first, as it may not be above the hard limit.
+        for flag, value in zip(("-S", "-H"), limits):
+            value = "unlimited" if value == resource.RLIM_INFINITY else value // unit
+            commands.append(f"ulimit {flag} {option} {value}")
+    # Like other commands that cannot be started, exit with 126 if this fails.
+    return " && ".join(commands) + " || exit 126"
+
+
+def _session_members(sid: int) -> list[int]:
+    """Return the live (not zombie) processes of a session."""
+    members = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        fields = read_stat(pid)
+        if fields is not None and fields[0] != b"Z" and int(fields[3]) == sid:
+            members.append(int(pid))
+    return members
+
+
+async def _wait_for_session(sid: int, timeout: float) -> list[int]:
+    """Wait until a session has no live processes, returning those left."""
+    deadline = time.monotonic() + timeout
+    while (members := _session_members(sid)) and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return members
+
+
+async def _terminate_session(sid: int, grace: float) -> list[int]:
+    """
+    Terminate every process of a session, returning those that were running.
+
+    Processes get SIGTERM first and SIGKILL if still running after `grace` seconds.
+    Processes that survive even that are logged as errors.
+    """
+    leftovers = survivors = _session_members(sid)
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        if not survivors:
+            break
+        for pid in survivors:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+        survivors = await _wait_for_session(sid, grace)
+    if survivors:
+        logger.error(f"Processes {survivors} survived SIGKILL and are still running.")
+    return leftovers
+
+
+# ==============================================================================
+# PUBLIC FUNCTIONS
+# ==============================================================================
+
+
+async def execute(
+    command: str,
+    timeout: float | None = None,
+    output: OutputBuffer | None = None,
+    sampler: ProcessSampler | None = None,
+    *,
+    shell: bool = True,
+    env: dict[str, str] | None = None,
+    rlimits: list[tuple[int, tuple[int, int]]] | None = None,
+) -> ProcessOutput:
+    """
+    Execute a command and wait for it to finish or reach the timeout.
+
+    The command runs through `/bin/sh`, unless `shell` is false: then it is split
+    like a shell would and executed directly, saving the cost of starting a shell.
+    Variables in `env` are added to the environment of the process, and `rlimits`
+    are applied by the shell with `ulimit` right before it runs the command (so that
+    nothing runs in the forked child while other threads hold locks). Commands with
+    limits are thus always started through the shell, even if `shell` is false.
+
+    Output is fed to `output` as it arrives (by default, it is simply stored). Many
+    commands can be awaited concurrently from the same event loop. The process is
+    reaped with `wait4`, so its resource usage (including all descendants it waited
+    for) is reported as well. Processes of its session still running once it is
+    done (or timed out) are terminated and logged, even if they moved to another
+    process group. They are terminated as well if the call is cancelled. With a
+    `sampler`, the process group of the command is sampled while it runs. Raises
+    `TimeoutError` after killing the process if the timeout is reached.
+
+    `elapsed` covers everything up to the output pipes being closed, while
+    `elapsed_ns` is measured with `perf_counter_ns` right before the process is
+    spawned and as soon as its exit is noticed.
+    """
+    loop = asyncio.get_running_loop()
+    output = output if output is not None else OutputBuffer()
+
+    t = time.monotonic()
+    start_ns = time.perf_counter_ns()
+    # Commands that cannot be started are reported like a shell would, as failed.
+    try:
+        args = command if shell else shlex.split(command)
+        if rlimits and shell:
+            args = f"{_ulimit(rlimits)}\n{command}"
+        elif rlimits:
+            script = f'{_ulimit(rlimits)}\nexec "$@"'
+            args, shell = ["/bin/sh", "-c", script, "sh", *args], False
+    except ValueError as error:
+        return ProcessOutput(
+            stdout="",
+            stderr=f"{command}: {error}\n",
+            returncode=2,
+            elapsed=time.monotonic() - t,
+            elapsed_ns=time.perf_counter_ns() - start_ns,
+        )
+    try:
+        process = sp.Popen(
+            args,
+            shell=shell,
+            stdout=sp.PIPE,
+            stderr=sp.PIPE,
+            start_new_session=True,
+            env={**os.environ, **env} if env else None,
+        )
+    except OSError as error:
+        # E.g. a missing executable, or a script without a shebang line.
+        return ProcessOutput(
+            stdout="",
+            stderr=f"{error.filename or args[0]}: {error.strerror}\n",
+            returncode=127 if isinstance(error, FileNotFoundError) else 126,
+            elapsed=time.monotonic() - t,
+            elapsed_ns=time.perf_counter_ns() - start_ns,
+        )
+    output.start(start_ns)
+    # The new session makes the process the leader of its own group.
+    samples = sampler.watch(process.pid) if sampler is not None else None
+
+    transports = []
+    waiters = [asyncio.ensure_future(_wait4(process.pid))]
+    try:
+        for fd, pipe in ((1, process.stdout), (2, process.stderr)):
+            closed = loop.create_future()
+            transport, _ = await loop.connect_read_pipe(
+                lambda: PipeProtocol(fd, output, closed), pipe
+            )
+            transports.append(transport)
+            waiters.append(closed)
+
+        # Like `Popen.communicate`, wait for the process to exit *and* close its
+        # pipes, which may be inherited by its own children.
+        await asyncio.wait(waiters, timeout=timeout)
+        timed_out = not all(x.done() for x in waiters)
+        elapsed = time.monotonic() - t
+        # Nothing started by the command may keep running into the next job.
+        if timed_out or _session_members(process.pid):
+            leftovers = await _terminate_session(process.pid, KILL_GRACE)
+            leftovers = [x for x in leftovers if x != process.pid]
+            if leftovers:
+                logger.warning(
+                    f"Terminated {len(leftovers)} processes left running by"
+                    f" {command!r}: {leftovers}"
+                )
+        status, rusage, exit_ns = await waiters[0]
+        # Tell `Popen` the process was already reaped.
+        process.returncode = os.waitstatus_to_exitcode(status)
+    except asyncio.CancelledError:
+        # The job was abandoned, so everything it started is stopped and reaped.
+        await _terminate_session(process.pid, KILL_GRACE)
+        status, _, _ = await waiters[0]
+        process.returncode = os.waitstatus_to_exitcode(status)
+        raise
+    finally:
+        if samples is not None:
+            sampler.unwatch(samples)
+        for transport in transports:
+            transport.close()
+        output.close()
+
+    if timed_out:
+        raise TimeoutError(f"command timed out after {timeout}s")
+
+    return ProcessOutput(
+        stdout=output.text(1),
+        stderr=output.text(2),
+        returncode=process.returncode,
+        elapsed=elapsed,
+        elapsed_ns=exit_ns - start_ns,
+        rusage=rusage,
+        samples=samples,
+    )
+
+
+async def calibrate(runs: int = CALIBRATION_RUNS) -> dict[str, list[int]]:
+    """
+    Measure the cost of launching a process, with and without a shell.
+
+    Returns the `elapsed_ns` of running `true` `runs` times in each mode, which is
+    the overhead included in the timing of every command.
+    """
+    return {
+        mode: [(await execute("true", shell=shell)).elapsed_ns for _ in range(runs)]
+        for mode, shell in (("shell", True), ("exec", False))
+    }
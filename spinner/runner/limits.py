@@ -0,0 +1,90 @@
+import re
+import resource
+import signal
+
+from spinner.runner.launcher import ProcessOutput
+from spinner.schema import SpinnerLimits
+
+# ==============================================================================
+# GLOBALS
+# ==============================================================================
+
+# Bytes of `stderr` kept to tell why a command with limits failed.
+STDERR_TAIL = 1 << 16
+
+# How programs usually report that they could not allocate memory or open files.
+_OUT_OF_MEMORY = re.compile(
+    r"MemoryError|Cannot allocate memory|[Oo]ut of memory|bad_alloc|ENOMEM"
+)
+_TOO_MANY_FILES = re.compile(r"Too many open files|EMFILE")
+
+# ==============================================================================
+# LOCAL FUNCTIONS
+# ==============================================================================
+
+
+def _signaled(sig: int) -> set[int]:
+    """Return codes of a process killed by `sig`, directly or through a shell."""
+    return {-sig, 128 + sig}
+
+
+# ==============================================================================
+# PUBLIC FUNCTIONS
+# ==============================================================================
+
+
+def resource_limits(limits: SpinnerLimits) -> list[tuple[int, tuple[int, int]]]:
+    """
+    Return the `setrlimit` arguments enforcing the given limits.
+
+    Hard limits are never raised above their current value, which an unprivileged
+    process is not allowed to do.
+    """
+    rlimits = []
+    for rlimit, soft, hard in (
+        (resource.RLIMIT_AS, limits.address_space, limits.address_space),
+        # SIGXCPU is sent at the soft limit; SIGKILL a second later, if ignored.
+        (
+            resource.RLIMIT_CPU,
+            limits.cpu_time,
+            limits.cpu_time and limits.cpu_time + 1,
+        ),
+        (resource.RLIMIT_NOFILE, limits.open_files, limits.open_files),
+        (resource.RLIMIT_CORE, None if limits.core_dumps else 0, None),
+    ):
+        if soft is None:
+            continue
+        _, current = resource.getrlimit(rlimit)
+        if current != resource.RLIM_INFINITY:
+            soft = min(soft, current)
+            hard = current if hard is None else min(hard, current)
+        elif hard is None:
+            hard = current
+        rlimits.append((rlimit, (soft, hard)))
+    return rlimits
+
+
+def limit_breached(
+    limits: SpinnerLimits, result: ProcessOutput, stderr: str = ""
+) -> str | None:
+    """
+    Return which limit a failed command most likely exceeded, if any.
+
+    CPU time is recognized by the signals sent when it is exceeded. Running out of
+    address space or file descriptors only shows up as an error inside the program,
+    so these are recognized by the messages in the tail of its `stderr`.
+    """
+    rusage = result.rusage
+    if limits.cpu_time is not None:
+        # The usage adds up all processes, while the limit applies to each one, so
+        # only the signals sent at the soft and hard limits tell a breach apart.
+        used = rusage.ru_utime + rusage.ru_stime if rusage is not None else 0.0
+        if result.returncode in _signaled(signal.SIGXCPU) or (
+            result.returncode in _signaled(signal.SIGKILL) and used >= limits.cpu_time
+        ):
+            return "cpu_time"
+    if limits.address_space is not None and _OUT_OF_MEMORY.search(stderr):
+        return "address_space"
+    if limits.open_files is not None and _TOO_MANY_FILES.search(stderr):
+        return "open_files"
+    return None
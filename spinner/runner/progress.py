@@ -31,7 +31,15 @@ class RunnerProgress(Progress):
             console=app,
             **kwargs,
         )
-        self.task = self.add_task("Running Benchmarks", total=total or config.num_jobs)
+        if total is None:
+            total = config.num_jobs
+        self.task = self.add_task("Running Benchmarks", total=total)
 
     def step(self) -> None:
         self.advance(self.task)
+
+    def skip(self, steps: int) -> None:
+        """Remove steps that will not be run from the total."""
+        if steps > 0:
+            (task,) = (x for x in self.tasks if x.id == self.task)
+            self.update(self.task, total=task.total - steps)
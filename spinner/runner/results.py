@@ -0,0 +1,59 @@
+import math
+from typing import Any
+
+import pandas as pd
+
+# ==============================================================================
+# GLOBALS
+# ==============================================================================
+
+# Outcome of a job: measured, or why it was not.
+STATUSES = ("ok", "timeout", "failed", "limit", "censored")
+
+# Compact types of the columns describing how each job ran.
+RESULT_DTYPES = {
+    "status": pd.CategoricalDtype(STATUSES),
+    "attempts": "UInt16",
+    "returncode": "Int16",
+}
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class ResultBuffer:
+    """
+    Accumulate result rows column by column.
+
+    Appending a row is a constant time operation, and the `DataFrame` is built only
+    once, when all the results are known. Columns missing from a row are filled with
+    NaN, and keys not seen before become new columns at the end, just like appending
+    rows to a `DataFrame` with `.loc`. Columns listed in `dtypes` are converted to
+    the given type once the frame is built.
+    """
+
+    def __init__(
+        self, columns: list[str], dtypes: dict[str, Any] | None = None
+    ) -> None:
+        self.columns: dict[str, list[Any]] = {column: [] for column in columns}
+        self.dtypes = dtypes or {}
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, row: dict[str, Any]) -> int:
+        """Append a row and return its index."""
+        for key in row:
+            if key not in self.columns:
+                self.columns[key] = [math.nan] * self.length
+        for key, values in self.columns.items():
+            values.append(row.get(key, math.nan))
+        self.length += 1
+        return self.length - 1
+
+    def to_frame(self) -> pd.DataFrame:
+        """Build a `DataFrame` with all the rows appended so far."""
+        df = pd.DataFrame(self.columns, columns=list(self.columns))
+        return df.astype({k: v for k, v in self.dtypes.items() if k in df})
@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from typing import Any
+
+# ==============================================================================
+# GLOBALS
+# ==============================================================================
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+# Columns of the samples table, besides the index of the result row.
+SAMPLE_COLUMNS = ("t", "rss", "cpu", "threads", "read_bytes", "write_bytes")
+
+# ==============================================================================
+# LOCAL FUNCTIONS
+# ==============================================================================
+
+
+def _read_stat(pid: str) -> tuple[int, int, int, int] | None:
+    """Return the process group, CPU ticks, threads and RSS pages of a process."""
+    fields = read_stat(pid)
+    if fields is None:
+        return None
+    return (
+        int(fields[2]),
+        int(fields[11]) + int(fields[12]),
+        int(fields[17]),
+        int(fields[21]),
+    )
+
+
+def _read_io(pid: str) -> tuple[int, int]:
+    """Return the bytes read from and written to storage by a process."""
+    io = {}
+    try:
+        with open(f"/proc/{pid}/io", "rb") as f:
+            for line in f:
+                key, _, value = line.partition(b":")
+                io[key] = int(value)
+    except (OSError, ValueError):
+        pass
+    return io.get(b"read_bytes", 0), io.get(b"write_bytes", 0)
+
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class SampleSeries:
+    """
+    Time series of the resource usage of a single process group.
+
+    At most `max_samples` samples are kept: once full, every other sample is dropped
+    and new samples are taken at half the rate, so long runs are still covered from
+    start to end.
+    """
+
+    def __init__(self, pgid: int, max_samples: int) -> None:
+        self.pgid = pgid
+        self.max_samples = max_samples
+        self.samples: list[tuple[float, int, float, int, int, int]] = []
+        self.start = time.monotonic()
+        self.stride = 1
+        self.ticks = 0
+        self.last_time = self.start
+        self.last_cpu: dict[str, int] = {}
+
+    def due(self) -> bool:
+        """Whether the next tick of the sampler should be recorded."""
+        self.ticks += 1
+        return self.ticks % self.stride == 0
+
+    def record(self, now: float, processes: dict[str, tuple[int, ...]]) -> None:
+        """
+        Record a sample from the `(ticks, threads, rss, read_bytes, write_bytes)` of
+        each process in the group.
+        """
+        elapsed = now - self.last_time
+        cpu = sum(
+            max(usage[0] - self.last_cpu.get(pid, 0), 0)
+            for pid, usage in processes.items()
+        )
+        _, threads, rss, read_bytes, write_bytes = (
+            map(sum, zip(*processes.values())) if processes else (0,) * 5
+        )
+
+        self.samples.append(
+            (
+                now - self.start,
+                rss * PAGE_SIZE,
+                100.0 * cpu / CLOCK_TICKS / elapsed if elapsed > 0 else 0.0,
+                threads,
+                read_bytes,
+                write_bytes,
+            )
+        )
+        self.last_time = now
+        self.last_cpu = {pid: usage[0] for pid, usage in processes.items()}
+
+        if len(self.samples) >= self.max_samples:
+            self.samples = self.samples[::2]
+            self.stride *= 2
+
+    def rows(self, row: int) -> list[dict[str, Any]]:
+        """Return the samples as rows of the samples table, linked to a result row."""
+        return [
+            {"row": row, **dict(zip(SAMPLE_COLUMNS, sample))} for sample in self.samples
+        ]
+
+
+class ProcessSampler:
+    """
+    Background thread polling `/proc` for the usage of the watched process groups.
+
+    A single thread serves every job running concurrently. Each tick scans the
+    processes once and records a sample for each group that is due.
+    """
+
+    def __init__(self, interval: float, max_samples: int) -> None:
+        self.interval = interval
+        self.max_samples = max_samples
+        self.watched: dict[int, SampleSeries] = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.loop, name="spinner-sampler", daemon=True
+        )
+
+    def __enter__(self) -> "ProcessSampler":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def watch(self, pgid: int) -> SampleSeries:
+        """Start sampling a process group."""
+        series = SampleSeries(pgid, self.max_samples)
+        with self.lock:
+            self.watched[pgid] = series
+        return series
+
+    def unwatch(self, series: SampleSeries) -> None:
+        """Stop sampling a process group, keeping the samples taken so far."""
+        with self.lock:
+            self.watched.pop(series.pgid, None)
+
+    def loop(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Record a sample of every watched group that is due."""
+        with self.lock:
+            due = {
+                pgid: series for pgid, series in self.watched.items() if series.due()
+            }
+        if not due:
+            return
+
+        groups: dict[int, dict[str, tuple[int, ...]]] = {pgid: {} for pgid in due}
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            stat = _read_stat(pid)
+            if stat is not None and stat[0] in groups:
+                groups[stat[0]][pid] = (*stat[1:], *_read_io(pid))
+
+        now = time.monotonic()
+        with self.lock:
+            for pgid, series in due.items():
+                # Skip groups that finished while their processes were scanned.
+                if self.watched.get(pgid) is series:
+                    series.record(now, groups[pgid])
+
+
+# ==============================================================================
+# PUBLIC FUNCTIONS
+# ==============================================================================
+
+
+def read_stat(pid: int | str) -> list[bytes] | None:
+    """
+    Return the fields of `/proc/<pid>/stat` that follow the command name.
+
+    The first one is the state of the process (the third field in `proc(5)`), so
+    e.g. its session is `fields[3]`. Returns None if the process is gone.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces, so fields are counted after it.
+    return stat[stat.rindex(b")") + 2 :].split()
@@ -0,0 +1,159 @@
+import heapq
+from collections import Counter
+from typing import Any, Container
+
+import pandas as pd
+
+from spinner.schema import SpinnerBenchmark
+
+# ==============================================================================
+# TYPES
+# ==============================================================================
+
+# Points of each (benchmark, application) pair assigned to a shard, by their
+# position in `sweep_parameters`.
+ShardPoints = dict[tuple[str, str], Container[int]]
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class ShardError(Exception):
+    """Raised when shard outputs cannot be merged."""
+
+
+# ==============================================================================
+# PUBLIC FUNCTIONS
+# ==============================================================================
+
+
+def partition(costs: list[float], count: int) -> list[int]:
+    """
+    Assign each item to one of `count` shards, balancing their total cost.
+
+    Items are taken from the most to the least expensive and given to the shard with
+    the lowest total so far (longest processing time first). Ties are broken by the
+    position of the items and the index of the shards, so the result only depends on
+    the costs. Equal costs are dealt round-robin.
+    """
+    shards = [0] * len(costs)
+    loads = [(0.0, shard) for shard in range(count)]
+    for item in sorted(range(len(costs)), key=lambda i: (-costs[i], i)):
+        load, shard = heapq.heappop(loads)
+        shards[item] = shard
+        heapq.heappush(loads, (load + costs[item], shard))
+    return shards
+
+
+def shard_points(
+    benchmarks: list[tuple[str, SpinnerBenchmark]],
+    extra: dict[str, Any] | None,
+    index: int,
+    count: int,
+) -> ShardPoints:
+    """
+    Select the points of shard `index` out of `count`.
+
+    Points of all benchmarks and applications are numbered in the order they would
+    run. Without any `shard_cost` estimate, shards take every `count`-th point, which is
+    computed without generating the sweep. Otherwise, points are partitioned by their
+    cost (see `partition`).
+    """
+    pairs = [
+        (name, application, benchmark)
+        for name, benchmark in benchmarks
+        for application in benchmark.application_names(name)
+    ]
+
+    if not any(benchmark["shard_cost"] is not None for _, benchmark in benchmarks):
+        points, offset = {}, 0
+        for name, application, benchmark in pairs:
+            total = benchmark.num_points(extra)
+            points[name, application] = range((index - offset) % count, total, count)
+            offset += total
+        return points
+
+    keys, costs = [], []
+    for name, application, benchmark in pairs:
+        for point, parameters in enumerate(benchmark.sweep_parameters(extra)):
+            keys.append((name, application, point))
+            costs.append(benchmark.cost(parameters))
+
+    points = {(name, application): set() for name, application, _ in pairs}
+    for (name, application, point), shard in zip(keys, partition(costs, count)):
+        if shard == index:
+            points[name, application].add(point)
+    return points
+
+
+def merge_shards(shards: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Combine the outputs of the shards of a run into a single output.
+
+    All shards must come from the same configuration, benchmark selection and extra
+    arguments, and be part of the same split. Rows are concatenated in shard order,
+    and the metadata of the first shard is kept, except for what differs between
+    shards: timestamps span the whole run, counters are added up and host names are
+    listed. The metadata of each shard is kept under `shards`.
+    """
+    if not shards:
+        raise ShardError("nothing to merge")
+
+    for data in shards:
+        if data["metadata"].get("shard") is None:
+            raise ShardError("not all outputs were run with --shard")
+
+    fingerprint = shards[0]["config"].fingerprint
+    if any(data["config"].fingerprint != fingerprint for data in shards):
+        raise ShardError("shards were run from different configurations")
+
+    for key, what in (("benchmark", "benchmarks"), ("extra_args", "extra args")):
+        value = shards[0]["metadata"].get(key)
+        if any(data["metadata"].get(key) != value for data in shards):
+            raise ShardError(f"shards were run with different {what}")
+
+    count = shards[0]["metadata"]["shard"][1]
+    if any(data["metadata"]["shard"][1] != count for data in shards):
+        raise ShardError("shards were split in different numbers of parts")
+
+    shards = sorted(shards, key=lambda data: data["metadata"]["shard"][0])
+    indices = [data["metadata"]["shard"][0] for data in shards]
+    if duplicated := sorted(i for i, n in Counter(indices).items() if n > 1):
+        raise ShardError(f"shards {duplicated} were given more than once")
+
+    frames, samples, offset = [], [], 0
+    for data in shards:
+        frames.append(data["dataframe"])
+        if "samples" in data:
+            # Samples point to the rows of their own shard.
+            samples.append(data["samples"].assign(row=data["samples"]["row"] + offset))
+        offset += len(data["dataframe"])
+
+    metadata = [data["metadata"] for data in shards]
+    failures: Counter[str] = Counter()
+    for m in metadata:
+        failures.update(m.get("failures") or {})
+
+    merged = {
+        **metadata[0],
+        "hostname": sorted({m["hostname"] for m in metadata}),
+        "start_ts": min(m["start_ts"] for m in metadata),
+        "end_ts": max(m["end_ts"] for m in metadata),
+        "end_env": metadata[-1]["end_env"],
+        "resumed": sum(m.get("resumed", 0) for m in metadata),
+        "cache_hits": sum(m.get("cache_hits", 0) for m in metadata),
+        "failures": dict(failures),
+        "shard": None,
+        "missing_shards": sorted(set(range(count)) - set(indices)),
+        "shards": metadata,
+    }
+
+    data = {
+        "config": shards[0]["config"],
+        "metadata": merged,
+        "dataframe": pd.concat(frames, ignore_index=True),
+    }
+    if samples:
+        data["samples"] = pd.concat(samples, ignore_index=True)
+    return data
@@ -0,0 +1,59 @@
+import math
+import statistics
+
+# ==============================================================================
+# LOCAL FUNCTIONS
+# ==============================================================================
+
+
+def _t_coverage(t: float, df: int) -> float:
+    """Probability that |T| < t for a Student's t distribution (A&S 26.7.3-4)."""
+    theta = math.atan(t / math.sqrt(df))
+    sin, cos2 = math.sin(theta), math.cos(theta) ** 2
+    total = term = 1.0
+    if df % 2:
+        if df == 1:
+            return 2 * theta / math.pi
+        for j in range(1, (df - 1) // 2):
+            term *= 2 * j / (2 * j + 1) * cos2
+            total += term
+        return 2 / math.pi * (theta + sin * math.cos(theta) * total)
+    for j in range(1, df // 2):
+        term *= (2 * j - 1) / (2 * j) * cos2
+        total += term
+    return sin * total
+
+
+# ==============================================================================
+# PUBLIC FUNCTIONS
+# ==============================================================================
+
+
+def t_quantile(confidence: float, df: int) -> float:
+    """Critical value of a two-sided `confidence` interval with `df` degrees."""
+    low, high = 0.0, 1.0
+    while _t_coverage(high, df) < confidence:
+        low, high = high, high * 2
+    for _ in range(64):
+        mid = (low + high) / 2
+        if _t_coverage(mid, df) < confidence:
+            low = mid
+        else:
+            high = mid
+    return high
+
+
+def relative_ci(values: list[float], confidence: float) -> float:
+    """
+    Half width of the confidence interval of the mean of `values`, relative to it.
+
+    Returns infinity when it cannot be estimated (less than two values or a zero
+    mean).
+    """
+    if len(values) < 2:
+        return math.inf
+    mean = statistics.fmean(values)
+    if mean == 0:
+        return math.inf
+    sem = statistics.stdev(values) / math.sqrt(len(values))
+    return t_quantile(confidence, len(values) - 1) * sem / abs(mean)
@@ -0,0 +1,95 @@
+import math
+import statistics
+from typing import Any
+
+# ==============================================================================
+# LOCAL FUNCTIONS
+# ==============================================================================
+
+
+def _point_key(parameters: dict[str, Any]) -> str:
+    return repr(sorted(parameters.items()))
+
+
+def _numeric(value: Any) -> bool:
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+        and value > 0
+    )
+
+
+# ==============================================================================
+# CLASSES
+# ==============================================================================
+
+
+class TimeoutEstimator:
+    """
+    Derive the timeout of each point from the time of previous runs.
+
+    A point that already ran gets `factor` times the median of its times. Otherwise,
+    its time is predicted from the points that differ from it in a single numeric
+    parameter: a power law is fitted to the two nearest of them along each such
+    parameter (or linear growth is assumed if only one is known), and the largest
+    prediction is used. Timeouts are never below `minimum` nor above `cap`, which
+    is also used when nothing is known yet.
+    """
+
+    def __init__(self, factor: float, minimum: float, cap: float) -> None:
+        self.factor = factor
+        self.minimum = minimum
+        self.cap = cap
+        self.times: dict[str, list[float]] = {}
+        # Known values of each parameter, given the values of all the others.
+        self.axes: dict[tuple[str, str], dict[float, str]] = {}
+
+    def observe(self, parameters: dict[str, Any], elapsed: float) -> None:
+        """Record the time of a successful run of a point."""
+        key = _point_key(parameters)
+        if key not in self.times:
+            self.times[key] = []
+            for axis, value in parameters.items():
+                if _numeric(value):
+                    self.axes.setdefault(self.axis_key(parameters, axis), {})[
+                        value
+                    ] = key
+        self.times[key].append(elapsed)
+
+    def axis_key(self, parameters: dict[str, Any], axis: str) -> tuple[str, str]:
+        others = {k: v for k, v in parameters.items() if k != axis}
+        return axis, _point_key(others)
+
+    def median(self, key: str) -> float:
+        return statistics.median(self.times[key])
+
+    def predict(self, parameters: dict[str, Any]) -> float | None:
+        """Predict the time of a point from its neighbours, if any are known."""
+        predictions = []
+        for axis, x in parameters.items():
+            if not _numeric(x):
+                continue
+            known = self.axes.get(self.axis_key(parameters, axis))
+            if not known:
+                continue
+            nearest = sorted(known, key=lambda v: abs(math.log(v / x)))[:2]
+            x1, y1 = nearest[0], self.median(known[nearest[0]])
+            if len(nearest) == 1:
+                predictions.append(y1 * max(x / x1, 1.0))
+                continue
+            x2, y2 = nearest[1], self.median(known[nearest[1]])
+            exponent = math.log(y2 / y1) / math.log(x2 / x1) if y1 > 0 < y2 else 1.0
+            predictions.append(y1 * (x / x1) ** max(exponent, 0.0))
+        return max(predictions) if predictions else None
+
+    def timeout(self, parameters: dict[str, Any]) -> float:
+        """Return the timeout for the next run of a point."""
+        key = _point_key(parameters)
+        if key in self.times:
+            expected = self.median(key)
+        else:
+            expected = self.predict(parameters)
+            if expected is None:
+                return self.cap
+        return min(max(self.factor * expected, self.minimum), self.cap)
@@ -1,80 +1,373 @@
+import asyncio
+import contextlib
 import os
 import pickle
-from typing import BinaryIO
+import random
+import secrets
+import statistics
+from collections import Counter
+from typing import Any, BinaryIO, Iterable, Iterator
 
 import pandas as pd
 
 from spinner.app import SpinnerApp
-from spinner.runner import InstanceRunner
+from spinner.runner import InstanceRunner, launcher
+from spinner.runner.cache import ResultCache
+from spinner.runner.journal import ResultJournal
 from spinner.runner.progress import RunnerProgress
-from spinner.schema import SpinnerConfig
+from spinner.runner.results import RESULT_DTYPES, ResultBuffer
+from spinner.runner.sampler import SAMPLE_COLUMNS, ProcessSampler
+from spinner.runner.sharding import ShardPoints, shard_points
+from spinner.schema import SpinnerBenchmark, SpinnerConfig
+
+# ==============================================================================
+# TYPES
+# ==============================================================================
+
+# A job of a runner: (runner, run index, command, parameters).
+Job = tuple[InstanceRunner, int | None, str, dict[str, Any]]
+
+# ==============================================================================
+# LOCAL FUNCTIONS
+# ==============================================================================
+
+
+async def _run_jobs(jobs: Iterable[Job], parallelism: int) -> None:
+    """Run the given jobs, at most `parallelism` of them at a time."""
+    pending: set[asyncio.Task] = set()
+    for runner, idx, command, parameters in jobs:
+        # Jobs are consumed on demand, so huge sweeps are never fully queued.
+        if len(pending) >= parallelism:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                task.result()
+        pending.add(asyncio.create_task(runner.run_job(idx, command, parameters)))
+
+    if pending:
+        done, _ = await asyncio.wait(pending)
+        for task in done:
+            task.result()
+
 
 # ==============================================================================
 # PUBLIC FUNCTIONS
 # ==============================================================================
 
 
-def run_benchmarks(
+def select_benchmarks(
+    config: SpinnerConfig, benchmark: str | None = None
+) -> list[tuple[str, SpinnerBenchmark]]:
+    """Return the benchmarks to run: all of them, or only the named one."""
+    if benchmark is None:
+        return list(config.benchmarks.items())
+    selected = config.benchmarks[benchmark]
+    if selected is None:
+        raise ValueError(f"Benchmark {benchmark!r} is undefined")
+    return [(benchmark, selected)]
+
+
+def create_runners(
     app: SpinnerApp,
     config: SpinnerConfig,
-    output: BinaryIO,
-    benchmark: str | None = None,
-    **extra,
-):
+    benchmarks: list[tuple[str, SpinnerBenchmark]],
+    extra: dict[str, Any],
+    points: ShardPoints | None = None,
+    **kwargs,
+) -> list[InstanceRunner]:
     """
-    Generate execution matrix from input configuration and run all benchmarks.
+    Create a runner for every benchmark and application pair.
+
+    With `points` (see `shard_points`), each runner only runs its selected points.
+    Other arguments are passed to every runner.
     """
-    # Create DataFrame to store benchmark data
-    df = pd.DataFrame(
-        columns=[
+    return [
+        InstanceRunner(
+            app,
+            config,
+            benchmark_name=benchmark_name,
+            application_name=application_name,
+            benchmark=benchmark_data,
+            extra_args=extra,
+            points=(
+                points[benchmark_name, application_name] if points is not None else None
+            ),
+            **kwargs,
+        )
+        for benchmark_name, benchmark_data in benchmarks
+        for application_name in benchmark_data.application_names(benchmark_name)
+    ]
+
+
+def count_jobs(
+    config: SpinnerConfig,
+    benchmarks: list[tuple[str, SpinnerBenchmark]],
+    extra: dict[str, Any],
+    points: ShardPoints | None = None,
+) -> int:
+    """
+    Count the jobs of a run without expanding the sweep, including extra parameters.
+
+    With adaptive repetition, this is an upper bound that shrinks as points finish.
+    """
+    if points is not None:
+        total_points = sum(len(selected) for selected in points.values())
+    else:
+        total_points = sum(
+            data.num_points(extra) * len(data.application_names(name))
+            for name, data in benchmarks
+        )
+    return config.metadata.runs_per_point * total_points
+
+
+def result_buffer(config: SpinnerConfig) -> ResultBuffer:
+    """Create the buffer holding the result rows of a run."""
+    return ResultBuffer(
+        [
             "name",
             *config.applications.variables,
             "time",
-        ]
+            "time_ns",
+            "status",
+            "attempts",
+            "returncode",
+        ],
+        dtypes=RESULT_DTYPES,
     )
 
-    # Save initial timestamp and environment variables.
-    start_ts = pd.Timestamp.now()
-    start_env = config.metadata.capture_environment()
 
-    # Loop through all benchmarks, executing one by one.
-    benchmark_items = list(config.benchmarks.items())
-    total_jobs = config.num_jobs
-    if benchmark is not None:
-        selected = config.benchmarks[benchmark]
-        if selected is None:
-            raise ValueError(f"Benchmark {benchmark!r} is undefined")
-        benchmark_items = [(benchmark, selected)]
-        total_jobs = (
-            config.metadata.runs
-            * selected.num_jobs
-            * len(selected.application_names(benchmark))
-        )
+def job_order(config: SpinnerConfig) -> tuple[str, int | None]:
+    """Return the order of the jobs of a run, and the seed shuffling them if any."""
+    order = config.metadata.order
+    seed = config.metadata.seed
+    if order == "random" and seed is None:
+        # Pick a seed anyway, so that the run can be reproduced from its metadata.
+        seed = secrets.randbits(32)
+    return order, seed
 
-    with RunnerProgress(app, config, total=total_jobs) as progress:
-        for benchmark_name, benchmark_data in benchmark_items:
-            for application_name in benchmark_data.application_names(benchmark_name):
-                runner = InstanceRunner(
-                    app,
-                    config,
-                    benchmark_name=benchmark_name,
-                    application_name=application_name,
-                    benchmark=benchmark_data,
-                    dataframe=df,
-                    progress=progress,
-                    extra_args=extra,
-                )
-                runner.run()
 
-    app.print(df)
+def ordered_jobs(
+    runners: list[InstanceRunner], order: str, runs: int, seed: int | None
+) -> Iterator[Job]:
+    """
+    Yield the jobs of all runners in the given order.
+
+    `sequential` runs all runs of a point back to back, `interleaved` runs every
+    point once before starting the next run, and `random` shuffles all jobs with
+    `seed`. Only `random` needs to hold the whole job list in memory.
+    """
+    if order == "interleaved":
+        for i in range(runs):
+            for runner in runners:
+                for job in runner.jobs(runs=[i]):
+                    yield (runner, *job)
+        return
+
+    jobs = ((runner, *job) for runner in runners for job in runner.jobs())
+    if order == "random":
+        jobs = list(jobs)
+        random.Random(seed).shuffle(jobs)
+    yield from jobs
+
 
-    metadata = {
+def median_overhead(launch_overhead: dict[str, list[int]]) -> dict[str, int]:
+    """Return the median launch overhead of each mode, measured by `calibrate`."""
+    return {
+        mode: int(statistics.median(samples))
+        for mode, samples in launch_overhead.items()
+    }
+
+
+def run_metadata(
+    config: SpinnerConfig,
+    start_ts: pd.Timestamp,
+    start_env: dict[str, Any],
+    benchmark: str | None,
+    extra: dict[str, Any],
+    *,
+    parallelism: int,
+    order: str,
+    seed: int | None,
+    launch_overhead: dict[str, list[int]] | None,
+    failures: Counter[str],
+    resumed: int = 0,
+    cache_hits: int = 0,
+    shard: tuple[int, int] | None = None,
+    **fields,
+) -> dict[str, Any]:
+    """Return the metadata stored with the results of a run that just finished."""
+    return {
         "hostname": os.uname().nodename,
         "start_ts": start_ts,
         "start_env": start_env,
         "end_ts": pd.Timestamp.now(),
         "end_env": config.metadata.capture_environment(),
+        "parallelism": parallelism,
+        "order": order,
+        "seed": seed,
+        "launch_overhead": launch_overhead,
+        "resumed": resumed,
+        "cache_hits": cache_hits,
+        "failures": dict(failures),
+        "shard": shard,
+        # What was swept, so that shards of different sweeps are not merged.
+        "benchmark": benchmark,
+        "extra_args": extra,
+        **fields,
         **extra,
     }
 
-    pickle.dump({"config": config, "metadata": metadata, "dataframe": df}, output)
+
+def write_output(
+    output: BinaryIO,
+    config: SpinnerConfig,
+    metadata: dict[str, Any],
+    df: pd.DataFrame,
+    samples: ResultBuffer | None = None,
+) -> None:
+    """Store the results of a run in `output`, as read by `spinner export`."""
+    data = {"config": config, "metadata": metadata, "dataframe": df}
+    if samples is not None:
+        # Time series of each run, linked to the result rows by their index.
+        data["samples"] = samples.to_frame()
+
+    pickle.dump(data, output)
+    output.flush()
+
+
+def run_benchmarks(
+    app: SpinnerApp,
+    config: SpinnerConfig,
+    output: BinaryIO,
+    benchmark: str | None = None,
+    extra_args: dict[str, Any] | None = None,
+    jobs: int | None = None,
+    journal: str | os.PathLike | None = None,
+    resume: bool = False,
+    use_cache: bool = True,
+    refresh: bool = False,
+    shard: tuple[int, int] | None = None,
+):
+    """
+    Generate execution matrix from input configuration and run all benchmarks.
+
+    `extra_args` are added to the parameters of every benchmark, and stored in the
+    output metadata.
+
+    When a `journal` path is given, every completed job is recorded there as soon as
+    it finishes. With `resume`, jobs already in the journal are skipped and their
+    results are reused.
+
+    When `metadata.cache` is set, results of identical jobs from previous runs are
+    reused, unless `use_cache` is false. With `refresh`, every job runs again and
+    the cached results are replaced.
+
+    With `shard` set to `(index, count)`, only the points of that part of the sweep
+    are run (see `shard_points`), so that the outputs of all parts can be merged.
+    """
+    extra = extra_args or {}
+
+    # Create buffer to store benchmark data
+    results = result_buffer(config)
+
+    # Save initial timestamp and environment variables.
+    start_ts = pd.Timestamp.now()
+    start_env = config.metadata.capture_environment()
+
+    # Loop through all benchmarks, executing one by one.
+    benchmark_items = select_benchmarks(config, benchmark)
+
+    points = None
+    if shard is not None:
+        points = shard_points(benchmark_items, extra, *shard)
+
+    total_jobs = count_jobs(config, benchmark_items, extra, points)
+
+    parallelism = jobs or config.metadata.parallelism
+
+    order, seed = job_order(config)
+
+    result_journal = None
+    resumed = 0
+    if journal is not None:
+        result_journal = ResultJournal(
+            journal, config, benchmark=benchmark, shard=shard, extra=extra
+        )
+        for row in result_journal.open(resume=resume):
+            results.append(row)
+            resumed += 1
+        if resumed:
+            app.print(f"Resuming from {journal}: {resumed} jobs already completed.")
+
+    result_cache = None
+    if use_cache and config.metadata.cache is not None:
+        result_cache = ResultCache(
+            config.metadata.cache.path,
+            config.metadata.cache.max_size,
+            environment=start_env,
+            refresh=refresh,
+        )
+
+    # Measure the cost of launching processes before anything else runs.
+    launch_overhead = overhead = None
+    if config.metadata.calibration:
+        launch_overhead = asyncio.run(launcher.calibrate(config.metadata.calibration))
+        overhead = median_overhead(launch_overhead)
+
+    failures: Counter[str] = Counter()
+
+    sampler = samples = None
+    if config.metadata.sampler is not None:
+        sampler = ProcessSampler(
+            config.metadata.sampler.interval, config.metadata.sampler.max_samples
+        )
+        samples = ResultBuffer(["row", *SAMPLE_COLUMNS])
+
+    with (
+        RunnerProgress(app, config, total=total_jobs) as progress,
+        result_journal or contextlib.nullcontext(),
+        sampler or contextlib.nullcontext(),
+    ):
+        runners = create_runners(
+            app,
+            config,
+            benchmark_items,
+            extra,
+            points,
+            results=results,
+            progress=progress,
+            journal=result_journal,
+            cache=result_cache,
+            sampler=sampler,
+            samples=samples,
+            launch_overhead=overhead,
+            failures=failures,
+        )
+
+        ordered = ordered_jobs(runners, order, config.metadata.runs, seed)
+        asyncio.run(_run_jobs(ordered, parallelism))
+
+    df = results.to_frame()
+    app.print(df)
+
+    metadata = run_metadata(
+        config,
+        start_ts,
+        start_env,
+        benchmark,
+        extra,
+        parallelism=parallelism,
+        order=order,
+        seed=seed,
+        launch_overhead=launch_overhead,
+        failures=failures,
+        resumed=resumed,
+        cache_hits=result_cache.hits if result_cache else 0,
+        shard=shard,
+    )
+    write_output(output, config, metadata, df, samples)
+
+    # The journal is only needed until the results are safely stored.
+    if result_journal is not None:
+        result_journal.remove()
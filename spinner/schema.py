@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import ast
+import hashlib
 import itertools as it
 import math
 import os
 import re
-from functools import cached_property
-from typing import Annotated, Any, Literal, Self
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from functools import cache, cached_property
+from typing import Annotated, Any, Callable, Iterator, Literal, Self
 
 import yaml
 from jinja2 import Environment, Template, meta
@@ -36,22 +39,253 @@ _LocationMessagePair = tuple[tuple[int | str, ...], str]
 #                            ~~~~~~~~~~~~~~~~~~~~~  ~~~
 #                                  LOCATION         MSG
 
+# Sizes in bytes, with an optional binary unit (e.g. 512M or 4G).
+_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*([bkmgt])?i?b?", re.IGNORECASE)
+
+# Keys of a benchmark that are not swept as parameters.
+_RESERVED_KEYS = {"zip", "apps", "where", "monotonic", "shard_cost"}
+
+# ==============================================================================
+# LOCAL FUNCTIONS
+# ==============================================================================
+
+
+@cache
+def _compile_lambda(source: str) -> Callable[..., Any]:
+    # Lambdas are evaluated once per distinct source and reused afterwards. They are
+    # not stored in the models themselves to keep the config picklable.
+    return eval(source)
+
+
+@cache
+def _compile_expression(source: str) -> Any:
+    try:
+        return compile(source, "<where>", "eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid expression {source!r}: {e.msg}") from e
+
+
+def _number(value: Any, name: str) -> int | float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    return value
+
+
+def _round(value: float) -> float:
+    # Avoids values such as 0.30000000000000004 showing up in rendered commands.
+    return float(f"{value:.12g}")
+
+
+def _size(value: Any) -> Any:
+    """Turn a size such as `512M` or `4G` into a number of bytes."""
+    if isinstance(value, str):
+        match = _SIZE.fullmatch(value.strip())
+        if match is None:
+            raise ValueError(f"invalid size {value!r}, expected e.g. 512M or 4G")
+        number, unit = match.groups()
+        return int(float(number) * 1024 ** "BKMGT".index((unit or "B").upper()))
+    return value
+
+
+def _expand_parameter(value: Any) -> Any:
+    """Turn a parameter generator (e.g. `{range: [1, 10]}`) into a sequence."""
+    if isinstance(value, dict):
+        ((kind, args),) = value.items()
+        return _PARAMETER_GENERATORS[kind](args)
+    return value
+
+
+def _product(values: list[Sequence]) -> Iterator[tuple]:
+    """Like `itertools.product`, but without materializing the sequences."""
+    if any(len(v) == 0 for v in values):
+        return
+    indices = [0] * len(values)
+    while True:
+        yield tuple(v[i] for v, i in zip(values, indices))
+        for pos in reversed(range(len(values))):
+            indices[pos] += 1
+            if indices[pos] < len(values[pos]):
+                break
+            indices[pos] = 0
+        else:
+            return
+
+
+# ==============================================================================
+# PARAMETER GENERATORS
+# ==============================================================================
+
+
+class SpinnerProgression(Sequence, ABC):
+    """A sequence of parameter values that is computed on demand."""
+
+    kind: str
+    length: int
+
+    def __init__(self, args: list[Any]) -> None:
+        if not isinstance(args, list):
+            raise ValueError(f"{self.kind} expects a list of arguments")
+        self.args = args
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self.item(i) for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(f"{self.kind} index out of range")
+        return self.item(index)
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self.item, range(self.length))
+
+    def __repr__(self) -> str:
+        return f"{{{self.kind}: {self.args}}}"
+
+    @abstractmethod
+    def item(self, index: int) -> Any:
+        """Compute the value at a valid, non-negative `index`."""
+
+
+class SpinnerRange(SpinnerProgression):
+    """`{range: [start, stop, step]}`: from `start` to `stop` (inclusive)."""
+
+    kind = "range"
+
+    def __init__(self, args: list[Any]) -> None:
+        super().__init__(args)
+        if len(args) not in (2, 3):
+            raise ValueError("range expects [start, stop] or [start, stop, step]")
+        self.start = _number(args[0], "start")
+        self.stop = _number(args[1], "stop")
+        self.step = _number(args[2], "step") if len(args) == 3 else 1
+        if self.step == 0:
+            raise ValueError("range step must not be zero")
+        self.integral = all(isinstance(x, int) for x in args)
+        self.length = math.floor((self.stop - self.start) / self.step + 1e-9) + 1
+        if self.length <= 0:
+            raise ValueError(f"range {args} is empty")
+
+    def item(self, index: int) -> int | float:
+        value = self.start + index * self.step
+        return value if self.integral else _round(value)
+
+
+class SpinnerGeom(SpinnerProgression):
+    """`{geom: [start, stop, factor]}`: powers of `factor` up to `stop` (inclusive)."""
+
+    kind = "geom"
+
+    def __init__(self, args: list[Any]) -> None:
+        super().__init__(args)
+        if len(args) not in (2, 3):
+            raise ValueError("geom expects [start, stop] or [start, stop, factor]")
+        self.start = _number(args[0], "start")
+        self.stop = _number(args[1], "stop")
+        self.factor = _number(args[2], "factor") if len(args) == 3 else 2
+        if self.start <= 0 or self.factor <= 1:
+            raise ValueError("geom requires start > 0 and factor > 1")
+        if self.stop < self.start:
+            raise ValueError(f"geom {args} is empty")
+        self.integral = all(isinstance(x, int) for x in args)
+        # The number of terms grows logarithmically, so counting them is cheap and
+        # avoids rounding issues of computing the logarithm directly.
+        self.length = 0
+        while self.start * self.factor**self.length <= self.stop * (1 + 1e-12):
+            self.length += 1
+
+    def item(self, index: int) -> int | float:
+        value = self.start * self.factor**index
+        return value if self.integral else _round(value)
+
+
+class SpinnerLogspace(SpinnerProgression):
+    """`{logspace: [start, stop, num, base]}`: `num` values, base^start to base^stop."""
+
+    kind = "logspace"
+
+    def __init__(self, args: list[Any]) -> None:
+        super().__init__(args)
+        if len(args) not in (3, 4):
+            raise ValueError(
+                "logspace expects [start, stop, num] or [start, stop, num, base]"
+            )
+        self.start = _number(args[0], "start")
+        self.stop = _number(args[1], "stop")
+        self.length = args[2]
+        self.base = _number(args[3], "base") if len(args) == 4 else 10
+        if isinstance(self.length, bool) or not isinstance(self.length, int):
+            raise ValueError("logspace num must be an integer")
+        if self.length < 1:
+            raise ValueError("logspace num must be at least 1")
+        if self.base <= 0:
+            raise ValueError("logspace base must be positive")
+
+    def item(self, index: int) -> float:
+        if self.length == 1:
+            return _round(self.base**self.start)
+        exponent = self.start + index * (self.stop - self.start) / (self.length - 1)
+        return _round(self.base**exponent)
+
+
+_PARAMETER_GENERATORS: dict[str, type[SpinnerProgression]] = {
+    x.kind: x for x in (SpinnerRange, SpinnerGeom, SpinnerLogspace)
+}
+
 # ==============================================================================
 # MODELS
 # ==============================================================================
 
 
+class SpinnerCache(BaseModel):
+    """Where and how much to cache the results of jobs between runs."""
+
+    path: str = ".spinner-cache"
+    max_size: int = Field(default=1 << 30, gt=0)
+
+
+class SpinnerSampler(BaseModel):
+    """How often to sample the processes of each run, and how much of it to keep."""
+
+    interval: PositiveFloat = 0.1
+    max_samples: int = Field(default=256, ge=2)
+
+
+class SpinnerAdaptiveTimeout(BaseModel):
+    """How to derive the timeout of each point from previous runs."""
+
+    factor: float = Field(default=3.0, gt=1.0)
+    minimum: PositiveFloat = 1.0
+
+
 class SpinnerMetadata(BaseModel):
     """The metadata section of the config."""
 
     description: str
     version: str = Field(pattern=r"^v?\d+\.\d+(\.\d+)?$")
     runs: int = Field(gt=0)
+    warmup: int = Field(default=0, ge=0)
+    min_runs: int | None = Field(default=None, ge=2)
+    max_runs: int | None = Field(default=None, gt=0)
+    target_rel_ci: PositiveFloat | None = None
+    ci_metric: str = "time"
+    confidence: float = Field(default=0.95, gt=0.0, lt=1.0)
     timeout: PositiveFloat | None = Field(default=None, gt=0.0)
+    adaptive_timeout: SpinnerAdaptiveTimeout | None = None
     retry: int = Field(default=0, ge=0)
+    parallelism: int = Field(default=1, ge=1)
+    order: Literal["sequential", "interleaved", "random"] = "sequential"
+    seed: int | None = None
     envvars: list[str] | str = Field(default_factory=list)
     success_on_return: list[int] | None = None
     fail_on_return: list[int] | None = None
+    cache: SpinnerCache | None = None
+    rusage: bool = False
+    calibration: int = Field(default=20, ge=0)
+    sampler: SpinnerSampler | None = None
 
     @field_validator("retry", mode="before")
     def validate_retry(cls, retry: int | bool) -> int:
@@ -59,6 +293,12 @@ class SpinnerMetadata(BaseModel):
             return 1 if retry else 0
         return retry
 
+    @field_validator("cache", "sampler", "adaptive_timeout", mode="before")
+    def validate_enabled(cls, value: Any) -> Any:
+        if isinstance(value, bool):
+            return {} if value else None
+        return value
+
     @field_validator("envvars", mode="after")
     def validate_envvars(cls, envvars: list[str] | str) -> list[str] | str:
         if isinstance(envvars, str) and envvars != "*":
@@ -70,17 +310,46 @@ class SpinnerMetadata(BaseModel):
     @model_validator(mode="after")
     def validate_returns(self) -> Self:
         if self.success_on_return is not None and self.fail_on_return is not None:
-            raise ValueError(
-                "Specify only one of success_on_return or fail_on_return"
-            )
-        if self.retry and self.timeout is None and not (
-            self.success_on_return or self.fail_on_return
+            raise ValueError("Specify only one of success_on_return or fail_on_return")
+        if (
+            self.retry
+            and self.timeout is None
+            and not (self.success_on_return or self.fail_on_return)
         ):
+            raise ValueError("retry requires a timeout or return code policy")
+        if self.adaptive_timeout is not None and self.timeout is None:
+            raise ValueError("adaptive_timeout requires a timeout, used as a cap")
+        if self.order != "sequential" and (self.warmup or self.adaptive):
             raise ValueError(
-                "retry requires a timeout or return code policy"
+                "warmup and target_rel_ci need the runs of each point back to back,"
+                " so they require order: sequential"
             )
+        if self.target_rel_ci is None:
+            if self.min_runs is not None or self.max_runs is not None:
+                raise ValueError("min_runs and max_runs require target_rel_ci")
+        else:
+            min_runs, max_runs = self.run_limits()
+            if min_runs > max_runs:
+                raise ValueError("min_runs must not be greater than max_runs")
         return self
 
+    @property
+    def adaptive(self) -> bool:
+        """Whether the number of runs of each point is decided as they finish."""
+        return self.target_rel_ci is not None
+
+    def run_limits(self) -> tuple[int, int]:
+        """Minimum and maximum number of (measured) runs of each point."""
+        if not self.adaptive:
+            return self.runs, self.runs
+        max_runs = self.max_runs or self.runs
+        return self.min_runs or min(3, max_runs), max_runs
+
+    @property
+    def runs_per_point(self) -> int:
+        """Upper bound on the runs of each point, including warmup runs."""
+        return self.warmup + self.run_limits()[1]
+
     def is_success(self, code: int) -> bool:
         if self.success_on_return is not None:
             return code in self.success_on_return
@@ -140,10 +409,18 @@ class SpinnerLambda(RootModel):
             raise ValueError(f"syntax error: {e}") from e
         except AssertionError as e:
             raise ValueError(f"{e}") from e
+        try:
+            _compile_lambda(root)
+        except Exception as e:
+            raise ValueError(f"invalid lambda: {e}") from e
         return root
 
+    @property
+    def function(self) -> Callable[..., Any]:
+        return _compile_lambda(self.root)
+
     def __call__(self, *args, **kwargs) -> Any:
-        return eval(self.root)(*args, **kwargs)
+        return self.function(*args, **kwargs)
 
 
 class SpinnerCaptureAll(BaseModel):
@@ -173,8 +450,21 @@ class SpinnerCaptureMatches(BaseModel):
         return self.name, capture
 
 
+class SpinnerCaptureMarker(BaseModel):
+    """Seconds since launch until a line matching `pattern` is first printed."""
+
+    type: Literal["marker"]
+    name: str
+    pattern: re.Pattern
+
+    @field_validator("pattern", mode="before")
+    def validate_pattern(cls, pattern: str) -> re.Pattern:
+        return re.compile(pattern)
+
+
 SpinnerCapture = Annotated[
-    SpinnerCaptureAll | SpinnerCaptureMatches, Field(discriminator="type")
+    SpinnerCaptureAll | SpinnerCaptureMatches | SpinnerCaptureMarker,
+    Field(discriminator="type"),
 ]
 
 
@@ -185,10 +475,40 @@ class SpinnerPlot(BaseModel):
     group_by: str | list[str] | None = Field(default=None)
 
 
+class SpinnerLimits(BaseModel):
+    """Resource limits applied to every run of an application."""
+
+    address_space: int | None = Field(default=None, gt=0)
+    cpu_time: int | None = Field(default=None, gt=0)
+    open_files: int | None = Field(default=None, gt=0)
+    core_dumps: bool = False
+
+    @model_validator(mode="before")
+    def validate_rss(cls, data: Any) -> Any:
+        # Linux ignores RLIMIT_RSS, so such a limit would never be enforced.
+        if isinstance(data, dict) and "rss" in data:
+            raise ValueError("rss cannot be limited on Linux, use address_space")
+        return data
+
+    @field_validator("address_space", mode="before")
+    def validate_size(cls, value: Any) -> Any:
+        return _size(value)
+
+
 class SpinnerApplication(BaseModel):
     command: SpinnerCommand
     capture: list[SpinnerCapture] = Field(default_factory=list)
     plot: list[SpinnerPlot] = Field(default_factory=list)
+    inputs: list[str] = Field(default_factory=list)
+    shell: bool = True
+    env: dict[str, str] = Field(default_factory=dict)
+    limits: SpinnerLimits | None = None
+
+    @field_validator("env", mode="before")
+    def validate_env(cls, env: Any) -> Any:
+        if isinstance(env, dict):
+            return {key: str(value) for key, value in env.items()}
+        return env
 
     def _validate_plot(self, plot: SpinnerPlot) -> tuple[tuple[Any], str]:
         errors = []
@@ -279,81 +599,194 @@ class SpinnerBenchmark(RootModel):
             return [app]
         if isinstance(app, list) and app and all(isinstance(x, str) for x in app):
             return app
-        raise ValueError(
-            "apps must be a string or a non-empty list of strings"
-        )
+        raise ValueError("apps must be a string or a non-empty list of strings")
+
+    @field_validator("root", mode="after")
+    def validate_parameters(cls, root: dict[str, Any]) -> dict[str, Any]:
+        generators = ", ".join(_PARAMETER_GENERATORS)
+        for key, value in root.items():
+            if key == "where":
+                constraints = [value] if isinstance(value, str) else value
+                if not isinstance(constraints, list) or not all(
+                    isinstance(x, str) for x in constraints
+                ):
+                    raise ValueError("where must be an expression or a list of them")
+                for constraint in constraints:
+                    _compile_expression(constraint)
+            if key == "monotonic":
+                names = [value] if isinstance(value, str) else value
+                if not isinstance(names, list) or not all(
+                    isinstance(x, str) for x in names
+                ):
+                    raise ValueError("monotonic must be a parameter or a list of them")
+                for name in names:
+                    if name not in root or name in _RESERVED_KEYS:
+                        raise ValueError(f"monotonic: undefined parameter {name!r}")
+            if key == "shard_cost":
+                if not isinstance(value, str):
+                    raise ValueError("shard_cost must be an expression")
+                _compile_expression(value)
+            if key in _RESERVED_KEYS:
+                continue
+            if isinstance(value, dict):
+                if len(value) != 1 or next(iter(value)) not in _PARAMETER_GENERATORS:
+                    raise ValueError(
+                        f"parameter {key!r} must use one generator ({generators})"
+                    )
+                try:
+                    _expand_parameter(value)
+                except ValueError as e:
+                    raise ValueError(f"parameter {key!r}: {e}") from e
+            elif not isinstance(value, list):
+                raise ValueError(
+                    f"parameter {key!r} must be a list of values or a generator "
+                    f"({generators})"
+                )
+        return root
 
     @cached_property
     def parameters(self) -> set[str]:
-        return set(k for k in self.root.keys() if k not in {"zip", "apps"})
+        return set(self.keys)
 
     @property
     def keys(self) -> list[str]:
-        return [k for k in self.root.keys() if k not in {"zip", "apps"}]
+        return [k for k in self.root.keys() if k not in _RESERVED_KEYS]
 
     @property
     def values(self) -> list[Any]:
-        return [v for k, v in self.root.items() if k not in {"zip", "apps"}]
+        return [
+            _expand_parameter(v)
+            for k, v in self.root.items()
+            if k not in _RESERVED_KEYS
+        ]
+
+    @property
+    def zip_keys(self) -> list[str]:
+        return self.root.get("zip") or []
+
+    @property
+    def constraints(self) -> list[str]:
+        where = self.root.get("where") or []
+        return [where] if isinstance(where, str) else where
+
+    @property
+    def monotonic(self) -> list[str]:
+        monotonic = self.root.get("monotonic") or []
+        return [monotonic] if isinstance(monotonic, str) else monotonic
+
+    def dominates(self, point: dict[str, Any], other: dict[str, Any]) -> bool:
+        """
+        Whether `other` is at least as slow as `point`, according to `monotonic`.
+
+        That is the case when both points are different, but only in monotonic
+        parameters, and those of `other` are not smaller than those of `point`.
+        """
+        monotonic = self.monotonic
+        if not monotonic or point == other:
+            return False
+        for key, value in point.items():
+            if key not in monotonic:
+                if other.get(key) != value:
+                    return False
+                continue
+            try:
+                if other[key] < value:
+                    return False
+            except (KeyError, TypeError):
+                return False
+        return True
+
+    def cost(self, parameters: dict[str, Any]) -> float:
+        """Estimate how long a point takes, relative to the others (default: 1)."""
+        source = self.root.get("shard_cost")
+        if source is None:
+            return 1.0
+        try:
+            cost = eval(_compile_expression(source), {"math": math}, parameters)
+        except Exception as e:
+            raise ValueError(
+                f"shard_cost {source!r} failed for {parameters}: {e}"
+            ) from e
+        if isinstance(cost, bool) or not isinstance(cost, (int, float)) or cost < 0:
+            raise ValueError(f"shard_cost {source!r} must be a non-negative number")
+        return float(cost)
+
+    def satisfies(self, parameters: dict[str, Any]) -> bool:
+        """Whether a combination of parameters satisfies all `where` constraints."""
+        for constraint in self.constraints:
+            try:
+                if not eval(
+                    _compile_expression(constraint), {"math": math}, parameters
+                ):
+                    return False
+            except Exception as e:
+                raise ValueError(
+                    f"constraint {constraint!r} failed for {parameters}: {e}"
+                ) from e
+        return True
+
+    def _zipped_length(self) -> int:
+        lengths = {len(_expand_parameter(self.root[k])) for k in self.zip_keys}
+        if len(lengths) > 1:
+            raise ValueError("zipped parameters must have the same length")
+        return lengths.pop()
 
     @cached_property
     def num_jobs(self) -> int:
-        zip_keys: list[str] | None = self.root.get("zip")  # type: ignore[assignment]
-        if zip_keys:
-            zipped_len = len(self.root[zip_keys[0]])
-            for key in zip_keys[1:]:
-                if len(self.root[key]) != zipped_len:
-                    raise ValueError("zipped parameters must have the same length")
-            other = math.prod(
-                len(v)
-                for k, v in self.root.items()
-                if k not in {*zip_keys, "zip", "apps"}
-            )
-            return zipped_len * other
-        return math.prod(
-            len(v) for k, v in self.root.items() if k not in {"zip", "apps"}
-        )
+        return self.num_points()
+
+    def num_points(self, extra: dict[str, Any] | None = None) -> int:
+        """Count the points of `sweep_parameters` without generating them."""
+        if self.constraints:
+            # Constraints can only be counted by checking every point, which is
+            # still done lazily, one point at a time.
+            return sum(1 for _ in self.sweep_parameters(extra))
+        zip_keys = self.zip_keys
+        points = self._zipped_length() if zip_keys else 1
+        return points * math.prod(len(v) for _, v in self._sweep_items(extra, zip_keys))
+
+    def _sweep_items(
+        self, extra: dict[str, Any] | None, exclude: list[str]
+    ) -> list[tuple[str, Any]]:
+        items = [(k, v) for k, v in zip(self.keys, self.values) if k not in exclude]
+        # Extra parameters are swept as well, single values being wrapped in a list.
+        for k, v in (extra or {}).items():
+            items.append((k, v if isinstance(v, list) else [v]))
+        return items
 
     def sweep_parameters(
         self, extra: dict[str, Any] | None = None
-    ) -> list[dict[str, Any]]:
-        # Start with all defined keys/values
-        keys = list(self.keys)
-        values = list(self.values)
-
-        # Handle any “zip”-grouped parameters
-        zip_keys: list[str] | None = self.root.get("zip")  # type: ignore[assignment]
-        zipped_sets: list[dict[str, Any]] = [dict()]
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Lazily generate every combination of parameters.
+
+        Zipped parameters advance together, and each zipped set is combined with the
+        Cartesian product of the remaining (and extra) parameters. Points are built
+        on demand, so memory use does not depend on the size of the sweep. Points
+        that do not satisfy the `where` constraints are skipped.
+        """
+        constrained = bool(self.constraints)
+        zip_keys = self.zip_keys
         if zip_keys:
-            # collect and sanity-check zipped lists
-            zipped_values = [self.root[k] for k in zip_keys]
-            length = len(zipped_values[0])
-            for v in zipped_values[1:]:
-                if len(v) != length:
-                    raise ValueError("zipped parameters must have the same length")
-            # build per-index dicts of zipped parameters
-            zipped_sets = [dict(zip(zip_keys, combo)) for combo in zip(*zipped_values)]
-            # remove those keys from the main sweep
-            keys = [k for k in keys if k not in zip_keys]
-            values = [self.root[k] for k in keys]
-
-        # Incorporate any “extra” parameters
-        if extra is not None:
-            for k, v in extra.items():
-                keys.append(k)
-                # wrap single values in a list
-                values.append(v if isinstance(v, list) else [v])
-
-        # Build the Cartesian product of all value-lists
-        combos = list(it.product(*values)) if values else [tuple()]
-        results: list[dict[str, Any]] = []
-        # For each zipped set and each combo, merge into one param dict
+            self._zipped_length()
+            zipped_sets = zip(*(_expand_parameter(self.root[k]) for k in zip_keys))
+        else:
+            zipped_sets = iter([()])
+
+        keys, values = [], []
+        for k, v in self._sweep_items(extra, zip_keys):
+            keys.append(k)
+            values.append(v)
+
+        # Generated parameters can be huge, so they are never materialized.
+        lazy = any(isinstance(v, SpinnerProgression) for v in values)
         for zipped in zipped_sets:
-            for combo in combos:
+            for combo in _product(values) if lazy else it.product(*values):
                 params = dict(zip(keys, combo))
-                params.update(zipped)
-                results.append(params)
-
-        return results
+                params.update(zip(zip_keys, zipped))
+                if constrained and not self.satisfies(params):
+                    continue
+                yield params
 
 
 class SpinnerBenchmarks(RootModel):
@@ -448,11 +881,24 @@ class SpinnerConfig(BaseModel):
 
         return errors
 
+    def validate_ci_metric(self) -> _LocationMessagePair:
+        captures = set().union(*(x.captures for _, x in self.applications.items()))
+        metrics = captures | {"time", "time_ns", "time_corrected"}
+        if (metric := self.metadata.ci_metric) not in metrics:
+            return [
+                (
+                    ("metadata", "ci_metric"),
+                    f"undefined metric {metric!r}, expected a capture or a time",
+                )
+            ]
+        return []
+
     @model_validator(mode="after")
     def validate(self) -> Self:
         errors = []
         errors += self.validate_benchmark_keys()
         errors += self.validate_application_placeholders()
+        errors += self.validate_ci_metric()
 
         if errors:
             # Create a `ValidationError` that aggregates errors from all validators
@@ -468,6 +914,11 @@ class SpinnerConfig(BaseModel):
 
         return self
 
+    @cached_property
+    def fingerprint(self) -> str:
+        """A hash of the config contents, to tell whether two runs are comparable."""
+        return hashlib.sha256(self.model_dump_json().encode()).hexdigest()
+
     @cached_property
     def num_jobs(self) -> int:
         jobs = 0
@@ -475,4 +926,4 @@ class SpinnerConfig(BaseModel):
             jobs += benchmark.num_jobs * len(
                 benchmark.application_names(benchmark_name)
             )
-        return self.metadata.runs * jobs
+        return self.metadata.runs_per_point * jobs
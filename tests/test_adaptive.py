@@ -0,0 +1,124 @@
+import pickle
+
+import pytest
+from pydantic import ValidationError
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.runner.stopping import relative_ci, t_quantile
+from spinner.schema import SpinnerConfig
+
+
+def run_value(tmp_path, command, **metadata):
+    counter = tmp_path / "counter"
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "adaptive",
+                "version": "1.0",
+                "runs": 10,
+                **metadata,
+            },
+            "applications": {
+                "value": {
+                    "command": f"echo run >> {counter}; {command}",
+                    "capture": [
+                        {
+                            "type": "matches",
+                            "name": "value",
+                            "pattern": "value=",
+                            "lambda": "lambda x: int(x.split('=')[1])",
+                        }
+                    ],
+                }
+            },
+            "benchmarks": {"value": {"x": [1, 2]}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    executed = len(counter.read_text().splitlines())
+    return pickle.loads(output.read_bytes())["dataframe"], executed
+
+
+def test_t_quantile():
+    assert t_quantile(0.95, 1) == pytest.approx(12.706, abs=1e-3)
+    assert t_quantile(0.95, 10) == pytest.approx(2.228, abs=1e-3)
+    assert t_quantile(0.99, 5) == pytest.approx(4.032, abs=1e-3)
+
+
+def test_relative_ci():
+    assert relative_ci([1.0], 0.95) == float("inf")
+    assert relative_ci([2.0, 2.0, 2.0], 0.95) == 0
+    assert relative_ci([1.0, 3.0], 0.95) == pytest.approx(12.706 / 2, abs=1e-3)
+
+
+def test_stable_metric_stops_at_min_runs(tmp_path):
+    df, executed = run_value(
+        tmp_path, "echo value=5", target_rel_ci=0.01, ci_metric="value", min_runs=3
+    )
+    assert executed == 6
+    assert df.groupby("x").size().tolist() == [3, 3]
+
+
+def test_noisy_metric_stops_at_max_runs(tmp_path):
+    df, executed = run_value(
+        tmp_path,
+        "python3 -c \"import random; print('value=%d' % random.randint(1, 100))\"",
+        target_rel_ci=1e-6,
+        ci_metric="value",
+        max_runs=5,
+    )
+    assert executed == 10
+    assert df.groupby("x").size().tolist() == [5, 5]
+
+
+def test_warmup_runs_are_excluded(tmp_path):
+    df, executed = run_value(tmp_path, "echo value=1", runs=2, warmup=3)
+    assert executed == 10
+    assert len(df) == 4
+
+
+def test_run_limits_validation():
+    metadata = {"description": "x", "version": "1.0", "runs": 5}
+    config = {"applications": {}, "benchmarks": {}}
+    with pytest.raises(ValidationError):
+        SpinnerConfig.from_data({"metadata": {**metadata, "min_runs": 3}, **config})
+    with pytest.raises(ValidationError):
+        SpinnerConfig.from_data(
+            {
+                "metadata": {**metadata, "target_rel_ci": 0.1, "min_runs": 8},
+                **config,
+            }
+        )
+
+
+def test_ci_metric_validation():
+    metadata = {"description": "x", "version": "1.0", "runs": 5, "target_rel_ci": 0.1}
+    applications = {
+        "app": {
+            "command": "echo value=1",
+            "capture": [
+                {
+                    "type": "matches",
+                    "name": "value",
+                    "pattern": "value=",
+                    "lambda": "lambda x: int(x.split('=')[1])",
+                }
+            ],
+        }
+    }
+    for metric in ("time", "time_corrected", "value"):
+        SpinnerConfig.from_data(
+            {
+                "metadata": {**metadata, "ci_metric": metric},
+                "applications": applications,
+            }
+        )
+    with pytest.raises(ValidationError, match="undefined metric 'tiem'"):
+        SpinnerConfig.from_data(
+            {
+                "metadata": {**metadata, "ci_metric": "tiem"},
+                "applications": applications,
+            }
+        )
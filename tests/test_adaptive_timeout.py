@@ -0,0 +1,87 @@
+import pickle
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.runner.timeouts import TimeoutEstimator
+from spinner.schema import SpinnerConfig
+
+
+def test_estimator_uses_history_of_point():
+    estimator = TimeoutEstimator(factor=3, minimum=0.5, cap=100)
+    point = {"size": 10, "mode": "a"}
+    assert estimator.timeout(point) == 100
+    for elapsed in (2.0, 1.0, 9.0):
+        estimator.observe(point, elapsed)
+    assert estimator.timeout(point) == 6.0
+
+    estimator.observe({"size": 1, "mode": "a"}, 0.01)
+    assert estimator.timeout({"size": 1, "mode": "a"}) == 0.5
+
+
+def test_estimator_fits_trend_of_neighbours():
+    estimator = TimeoutEstimator(factor=2, minimum=0.1, cap=1000)
+    estimator.observe({"size": 1, "mode": "a"}, 1.0)
+    # A single neighbour: linear growth is assumed.
+    assert estimator.timeout({"size": 3, "mode": "a"}) == pytest.approx(6.0)
+
+    estimator.observe({"size": 2, "mode": "a"}, 4.0)
+    # Two neighbours: quadratic growth, 4 * (8 / 2) ** 2 = 64.
+    assert estimator.timeout({"size": 8, "mode": "a"}) == pytest.approx(128.0)
+    # Points differing in a non-numeric parameter are not neighbours.
+    assert estimator.timeout({"size": 8, "mode": "b"}) == 1000
+
+
+def test_adaptive_timeout_requires_cap():
+    with pytest.raises(ValidationError):
+        SpinnerConfig.from_data(
+            {
+                "metadata": {
+                    "description": "x",
+                    "version": "1.0",
+                    "runs": 1,
+                    "adaptive_timeout": True,
+                },
+                "applications": {},
+                "benchmarks": {},
+            }
+        )
+
+
+def test_hung_run_is_stopped_early(tmp_path):
+    log = tmp_path / "log"
+    log.touch()
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "timeouts",
+                "version": "1.0",
+                "runs": 4,
+                "timeout": 30,
+                "adaptive_timeout": {"factor": 3, "minimum": 0.3},
+            },
+            "applications": {
+                "hang": {
+                    "command": (
+                        f"n=$(wc -l < {log}); echo >> {log};"
+                        " if [ $n -eq 2 ]; then sleep 30; fi; sleep 0.1"
+                    )
+                }
+            },
+            "benchmarks": {"hang": {}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    t = time.monotonic()
+    run(SpinnerApp.get(), config, output.open("wb"))
+    assert time.monotonic() - t < 10
+    data = pickle.loads(output.read_bytes())
+
+    df = data["dataframe"]
+    assert df["status"].tolist() == ["ok", "ok", "timeout", "ok"]
+    assert df["effective_timeout"].iloc[0] == 30
+    assert df["effective_timeout"].iloc[1] == pytest.approx(0.3, abs=0.1)
+    assert data["metadata"]["failures"] == {"timeout": 1}
@@ -0,0 +1,105 @@
+import pickle
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.runner.cache import ResultCache
+from spinner.schema import SpinnerConfig
+
+
+def make_config(tmp_path) -> SpinnerConfig:
+    counter = tmp_path / "counter"
+    binary = tmp_path / "binary"
+    binary.write_text("v1")
+    return SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "cache",
+                "version": "1.0",
+                "runs": 2,
+                "cache": {"path": str(tmp_path / "cache")},
+            },
+            "applications": {
+                "echo": {
+                    "command": f"echo run >> {counter}; echo value={{{{ x }}}}",
+                    "inputs": [str(binary)],
+                    "capture": [
+                        {
+                            "type": "matches",
+                            "name": "value",
+                            "pattern": "value=",
+                            "lambda": "lambda x: int(x.split('=')[1])",
+                        }
+                    ],
+                }
+            },
+            "benchmarks": {"echo": {"x": [1, 2]}},
+        }
+    )
+
+
+def run_config(tmp_path, config, **kwargs):
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"), **kwargs)
+    data = pickle.loads(output.read_bytes())
+    executed = len((tmp_path / "counter").read_text().splitlines())
+    return data["metadata"], data["dataframe"], executed
+
+
+def test_cache_reuses_results(tmp_path):
+    config = make_config(tmp_path)
+    _, first, executed = run_config(tmp_path, config)
+    assert executed == 4
+
+    metadata, second, executed = run_config(tmp_path, config)
+    assert executed == 4
+    assert metadata["cache_hits"] == 4
+    assert second["time"].tolist() == first["time"].tolist()
+    assert second["value"].tolist() == [1, 1, 2, 2]
+
+
+def test_cache_invalidated_by_inputs(tmp_path):
+    config = make_config(tmp_path)
+    run_config(tmp_path, config)
+
+    (tmp_path / "binary").write_text("v2, rebuilt")
+    metadata, _, executed = run_config(tmp_path, config)
+    assert metadata["cache_hits"] == 0
+    assert executed == 8
+
+
+def test_cache_refresh_and_disable(tmp_path):
+    config = make_config(tmp_path)
+    run_config(tmp_path, config)
+
+    metadata, _, executed = run_config(tmp_path, config, refresh=True)
+    assert metadata["cache_hits"] == 0
+    assert executed == 8
+
+    metadata, _, executed = run_config(tmp_path, config, use_cache=False)
+    assert metadata["cache_hits"] == 0
+    assert executed == 12
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_size=2000)
+    keys = [cache.key(f"cmd {i}", "app", 0) for i in range(10)]
+    for key in keys:
+        cache.put(key, {"payload": "x" * 500})
+
+    assert cache.size <= 2000
+    assert cache.get(keys[-1]) is not None
+    assert cache.get(keys[0]) is None
+    assert sum(x.stat().st_size for x in cache.entries()) == cache.size
+
+
+def test_cache_evicts_down_to_the_low_water_mark(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache", max_size=100_000)
+    evictions = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: evictions.append(evict()))
+    for i in range(300):
+        cache.put(cache.key(f"cmd {i}", "app", 0), {"payload": "x" * 500})
+
+    assert cache.size <= 100_000
+    # Each eviction frees a tenth of the cache, room for about 19 more entries.
+    assert len(evictions) <= 10
@@ -0,0 +1,112 @@
+import asyncio
+
+from spinner.runner import launcher
+from spinner.runner.capture import CaptureEngine
+from spinner.schema import SpinnerApplication
+
+
+def make_application(*captures) -> SpinnerApplication:
+    return SpinnerApplication(command="true", capture=list(captures))
+
+
+def matches(name: str, pattern: str, func: str = "lambda x: x"):
+    return {"type": "matches", "name": name, "pattern": pattern, "lambda": func}
+
+
+def test_stream_matches_lines_split_across_chunks():
+    app = make_application(matches("value", "value=", "lambda x: int(x[6:])"))
+    stream = CaptureEngine(app.capture).stream()
+    for chunk in [b"noise\nval", b"ue=4", b"2\nvalue=7\n"]:
+        stream.feed(1, chunk)
+    stream.close()
+    assert stream.results() == {"value": 42}
+
+
+def test_stream_prefers_stdout_over_stderr():
+    app = make_application(matches("a", "a="), matches("b", "b="))
+    stream = CaptureEngine(app.capture).stream()
+    stream.feed(2, b"a=err\nb=err\n")
+    stream.feed(1, b"a=out\n")
+    stream.close()
+    assert stream.results() == {"a": "a=out", "b": "b=err"}
+
+
+def test_stream_matches_last_line_without_newline():
+    app = make_application(matches("last", "end"))
+    stream = CaptureEngine(app.capture).stream()
+    stream.feed(1, b"start\nend")
+    stream.close()
+    assert stream.results() == {"last": "end"}
+
+
+def test_stream_discards_output_once_satisfied():
+    app = make_application(matches("first", "x"))
+    stream = CaptureEngine(app.capture).stream()
+    stream.feed(1, b"x\n")
+    assert stream.satisfied
+    for _ in range(1000):
+        stream.feed(1, b"y" * 1000 + b"\n")
+    stream.close()
+    assert stream.results() == {"first": "x"}
+    assert len(stream.output[1]) == 0
+    assert len(stream.partial[1]) == 0
+
+
+def test_stream_keeps_output_for_capture_all():
+    app = make_application({"type": "all", "name": "raw"}, matches("m", "b"))
+    stream = CaptureEngine(app.capture).stream()
+    stream.feed(1, b"a\nb\n")
+    stream.feed(2, b"c\n")
+    stream.close()
+    assert stream.results() == {"raw": "a\nb\n\nc\n", "m": "b"}
+
+
+def test_scanner_dispatches_line_matching_many_patterns():
+    app = make_application(matches("a", "t"), matches("b", "ti"), matches("c", "x"))
+    stream = CaptureEngine(app.capture).stream()
+    stream.feed(1, b"time\nx\n")
+    stream.close()
+    assert stream.results() == {"a": "time", "b": "time", "c": "x"}
+
+
+def test_scanner_handles_patterns_that_cannot_be_merged():
+    app = make_application(
+        matches("ref", r"(\w)\1"),
+        matches("named", r"(?P<v>\d+)"),
+        matches("again", r"(?P<v>[a-z]+)=1"),
+        matches("flags", r"(?i)error"),
+    )
+    engine = CaptureEngine(app.capture)
+    scanner = engine.scanner(set())
+    assert all(x.name != "ref" for x in scanner.combined)
+    assert all(x.name != "flags" for x in scanner.combined)
+    # Only the second pattern using the group name is kept apart.
+    assert [x.name for x in scanner.combined] == ["named"]
+    assert [x.name for x in scanner.separate] == ["ref", "again", "flags"]
+
+    stream = engine.stream()
+    stream.feed(1, b"ab\naa\n42\nkey=1\nERROR!\n")
+    stream.close()
+    assert stream.results() == {
+        "ref": "aa",
+        "named": "42",
+        "again": "key=1",
+        "flags": "ERROR!",
+    }
+
+
+def test_stream_records_markers_from_any_stream():
+    app = make_application(
+        {"type": "marker", "name": "init", "pattern": "init done"},
+        {"type": "marker", "name": "solve", "pattern": "solve done"},
+        {"type": "marker", "name": "never", "pattern": "never"},
+    )
+    stream = CaptureEngine(app.capture).stream()
+    command = "echo init done; sleep 0.3; echo solve done >&2; echo init done"
+    result = asyncio.run(launcher.execute(command, output=stream))
+
+    markers = stream.results()
+    assert markers["never"] is None
+    assert 0 <= markers["init"] < 0.2
+    assert 0.3 <= markers["solve"] - markers["init"] < 0.6
+    assert markers["solve"] <= result.elapsed_ns / 1e9
@@ -0,0 +1,196 @@
+import os
+import pickle
+import socket
+import subprocess
+import sys
+import threading
+
+from spinner.app import SpinnerApp
+from spinner.runner import InstanceRunner, distributed, run
+from spinner.runner.distributed import Coordinator
+from spinner.schema import SpinnerConfig
+
+AUTHKEY = "secret"
+
+
+def make_config(command: str, runs: int = 2) -> SpinnerConfig:
+    return SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "distributed",
+                "version": "1.0",
+                "runs": runs,
+                "calibration": 0,
+            },
+            "applications": {
+                "echo": {
+                    "command": command,
+                    "capture": [
+                        {
+                            "type": "matches",
+                            "name": "value",
+                            "pattern": "value=",
+                            "lambda": "lambda x: int(x.split('=')[1])",
+                        }
+                    ],
+                }
+            },
+            "benchmarks": {"echo": {"x": [1, 2, 3, 4, 5]}},
+        }
+    )
+
+
+def start_worker(address, authkey=AUTHKEY, jobs=2):
+    host, port = address
+    return subprocess.Popen(
+        [sys.executable, "-m", "spinner", "worker"]
+        + ["--connect", f"{host}:{port}", "--jobs", str(jobs)],
+        env={**os.environ, "SPINNER_AUTHKEY": authkey},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def serve(tmp_path, config, workers=3):
+    coordinator = Coordinator(
+        SpinnerApp.get(), config, ("127.0.0.1", 0), AUTHKEY.encode()
+    )
+    processes = [start_worker(coordinator.address) for _ in range(workers)]
+    output = tmp_path / "out.pkl"
+    try:
+        coordinator.run(output.open("wb"))
+    finally:
+        for process in processes:
+            process.wait(timeout=10)
+    return pickle.loads(output.read_bytes()), processes
+
+
+def test_workers_run_every_job(tmp_path):
+    data, processes = serve(tmp_path, make_config("echo value={{ x }}"))
+    df = data["dataframe"]
+    assert sorted(df["x"].tolist()) == sorted([1, 2, 3, 4, 5] * 2)
+    assert (df["value"] == df["x"]).all()
+    assert (df["status"] == "ok").all()
+
+    workers = data["metadata"]["workers"]
+    assert len(workers) == 3
+    assert sum(worker["completed"] for worker in workers) == 10
+    assert data["metadata"]["parallelism"] == 6
+    assert all(process.returncode == 0 for process in processes)
+
+
+def test_output_matches_a_local_run(tmp_path):
+    config = make_config("echo value={{ x }}")
+    data, _ = serve(tmp_path, config, workers=1)
+    output = tmp_path / "local.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    local = pickle.loads(output.read_bytes())
+    assert set(data["metadata"]) == set(local["metadata"]) | {"workers"}
+    assert data["dataframe"].dtypes.equals(local["dataframe"].dtypes)
+
+
+def test_jobs_of_dead_workers_are_requeued(tmp_path):
+    # The first job to run kills its worker.
+    marker = tmp_path / "killed"
+    command = (
+        f"if mkdir {marker} 2>/dev/null; then kill -9 $PPID; sleep 1; fi;"
+        " echo value={{ x }}"
+    )
+    data, processes = serve(tmp_path, make_config(command), workers=2)
+    df = data["dataframe"]
+    assert sorted(df["x"].tolist()) == sorted([1, 2, 3, 4, 5] * 2)
+    assert (df["status"] == "ok").all()
+    assert sorted(process.returncode for process in processes) == [-9, 0]
+
+
+def test_jobs_that_raise_are_failed_rows(tmp_path, monkeypatch):
+    run_job = InstanceRunner.run_job
+
+    async def broken_run_job(self, idx, command, parameters):
+        if parameters["x"] == 3:
+            raise RuntimeError("broken")
+        await run_job(self, idx, command, parameters)
+
+    monkeypatch.setattr(InstanceRunner, "run_job", broken_run_job)
+    coordinator = Coordinator(
+        SpinnerApp.get(),
+        make_config("echo value={{ x }}"),
+        ("127.0.0.1", 0),
+        AUTHKEY.encode(),
+    )
+    worker = threading.Thread(
+        target=distributed.run_worker,
+        args=(SpinnerApp.get(), coordinator.address, AUTHKEY.encode()),
+    )
+    worker.start()
+    output = tmp_path / "out.pkl"
+    coordinator.run(output.open("wb"))
+    worker.join(timeout=10)
+
+    data = pickle.loads(output.read_bytes())
+    df = data["dataframe"]
+    assert df[df["status"] == "failed"]["x"].tolist() == [3, 3]
+    assert (df[df["x"] != 3]["status"] == "ok").all()
+    assert data["metadata"]["failures"] == {"failed": 2}
+
+
+def test_worker_with_wrong_key_is_rejected(tmp_path):
+    config = make_config("echo value={{ x }}", runs=1)
+    coordinator = Coordinator(
+        SpinnerApp.get(), config, ("127.0.0.1", 0), AUTHKEY.encode()
+    )
+    intruder = start_worker(coordinator.address, authkey="wrong")
+    thread = threading.Thread(target=coordinator.run, args=(open(os.devnull, "wb"),))
+    thread.start()
+    assert intruder.wait(timeout=10) == 1
+
+    worker = start_worker(coordinator.address)
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+    assert worker.wait(timeout=10) == 0
+
+
+def test_broken_and_silent_connections_do_not_block_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, "HANDSHAKE_TIMEOUT", 0.5)
+    config = make_config("echo value={{ x }}", runs=1)
+    coordinator = Coordinator(
+        SpinnerApp.get(), config, ("127.0.0.1", 0), AUTHKEY.encode()
+    )
+    output = tmp_path / "out.pkl"
+    thread = threading.Thread(target=coordinator.run, args=(output.open("wb"),))
+    thread.start()
+
+    # A port probe, and a client that never answers the challenge.
+    socket.create_connection(coordinator.address).close()
+    silent = socket.create_connection(coordinator.address)
+    silent.settimeout(5)
+
+    worker = start_worker(coordinator.address)
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+    assert worker.wait(timeout=10) == 0
+    assert len(pickle.loads(output.read_bytes())["dataframe"]) == 5
+
+    # The silent client is disconnected once its time is up.
+    while silent.recv(1024):
+        pass
+    silent.close()
+
+
+def test_points_with_warmup_are_single_jobs(tmp_path):
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "distributed",
+                "version": "1.0",
+                "runs": 2,
+                "warmup": 1,
+                "calibration": 0,
+            },
+            "applications": {"echo": {"command": "echo value={{ x }}"}},
+            "benchmarks": {"echo": {"x": [1, 2]}},
+        }
+    )
+    data, _ = serve(tmp_path, config, workers=2)
+    df = data["dataframe"]
+    assert sorted(df["x"].tolist()) == [1, 1, 2, 2]
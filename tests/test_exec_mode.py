@@ -0,0 +1,104 @@
+import pickle
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.schema import SpinnerConfig
+
+
+def test_exec_mode_application(tmp_path):
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {"description": "exec", "version": "1.0", "runs": 1},
+            "applications": {
+                "env": {
+                    "command": "sh -c 'echo value=${SPINNER_N}{{ x }}'",
+                    "shell": False,
+                    "env": {"SPINNER_N": 4},
+                    "capture": [
+                        {
+                            "type": "matches",
+                            "name": "value",
+                            "pattern": "value=",
+                            "lambda": "lambda x: int(x.split('=')[1])",
+                        }
+                    ],
+                }
+            },
+            "benchmarks": {"env": {"x": [1, 2]}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    data = pickle.loads(output.read_bytes())
+
+    assert data["dataframe"]["value"].tolist() == [41, 42]
+    assert set(data["metadata"]["launch_overhead"]) == {"shell", "exec"}
+
+
+def test_corrected_time(tmp_path):
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "time",
+                "version": "1.0",
+                "runs": 2,
+                "calibration": 5,
+            },
+            "applications": {"sleep": {"command": "sleep {{ x }}"}},
+            "benchmarks": {"sleep": {"x": [0.1]}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    data = pickle.loads(output.read_bytes())
+    df, overhead = data["dataframe"], data["metadata"]["launch_overhead"]
+
+    assert all(len(x) == 5 for x in overhead.values())
+    assert (df["time_ns"] >= 0.1e9).all()
+    assert (df["time_corrected"] < df["time_ns"] / 1e9).all()
+    assert (df["time_corrected"] >= 0.1 - 0.05).all()
+
+
+def test_calibration_disabled(tmp_path):
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "time",
+                "version": "1.0",
+                "runs": 1,
+                "calibration": 0,
+            },
+            "applications": {"true": {"command": "true"}},
+            "benchmarks": {"true": {}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    data = pickle.loads(output.read_bytes())
+
+    assert data["metadata"]["launch_overhead"] is None
+    assert "time_corrected" not in data["dataframe"]
+
+
+def test_corrected_time_of_command_that_cannot_start(tmp_path):
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "time",
+                "version": "1.0",
+                "runs": 1,
+                "calibration": 2,
+                "fail_on_return": [1],
+            },
+            "applications": {"missing": {"command": "does-not-exist", "shell": False}},
+            "benchmarks": {"missing": {}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    df = pickle.loads(output.read_bytes())["dataframe"]
+
+    assert df["returncode"].tolist() == [127]
+    assert df["status"].tolist() == ["ok"]
+    assert df["time_ns"].iloc[0] >= 0
+    assert df["time_corrected"].iloc[0] >= 0
@@ -3,8 +3,10 @@ from pathlib import Path
 
 import pytest
 import yaml
+from click.testing import CliRunner
 
 from spinner.app import SpinnerApp
+from spinner.cli.main import cli
 from spinner.cli.util import ExtraArgs
 from spinner.runner import run
 from spinner.schema import SpinnerBenchmark, SpinnerConfig
@@ -24,7 +26,7 @@ def test_extra_args_parser_list():
 
 def test_sweep_parameters_with_string_extra():
     bench = SpinnerBenchmark({"node_count": [1, 2]})
-    params = bench.sweep_parameters({"hosts": "machineA,machineB"})
+    params = list(bench.sweep_parameters({"hosts": "machineA,machineB"}))
     assert params == [
         {"node_count": 1, "hosts": "machineA,machineB"},
         {"node_count": 2, "hosts": "machineA,machineB"},
@@ -33,7 +35,7 @@ def test_sweep_parameters_with_string_extra():
 
 def test_sweep_parameters_with_list():
     bench = SpinnerBenchmark({"sleep_amount": [1, 2]})
-    params = bench.sweep_parameters({"extra_time": [3, 4]})
+    params = list(bench.sweep_parameters({"extra_time": [3, 4]}))
     assert params == [
         {"sleep_amount": 1, "extra_time": 3},
         {"sleep_amount": 1, "extra_time": 4},
@@ -47,7 +49,12 @@ def test_run_example_extra_args(tmp_path):
     config = SpinnerConfig.from_data(yaml.safe_load(path.read_text()))
     output = tmp_path / "out.pkl"
 
-    run(SpinnerApp.get(), config, output.open("wb"), hosts="machineA,machineB")
+    run(
+        SpinnerApp.get(),
+        config,
+        output.open("wb"),
+        extra_args={"hosts": "machineA,machineB"},
+    )
 
     data = pickle.loads(output.read_bytes())
     df = data["dataframe"]
@@ -59,13 +66,37 @@ def test_run_example_extra_args_list(tmp_path):
     config = SpinnerConfig.from_data(yaml.safe_load(path.read_text()))
     output = tmp_path / "out.pkl"
 
-    run(SpinnerApp.get(), config, output.open("wb"), sleep_time=[1, 2])
+    run(SpinnerApp.get(), config, output.open("wb"), extra_args={"sleep_time": [1, 2]})
 
     data = pickle.loads(output.read_bytes())
     df = data["dataframe"]
     assert df["sleep_time"].tolist() == [1, 2]
 
 
+def test_extra_args_named_like_run_options(tmp_path):
+    config = tmp_path / "bench.yaml"
+    config.write_text(
+        """
+metadata:
+  description: x
+  version: "1.0"
+  runs: 1
+applications:
+  make:
+    command: echo -j {{ jobs }} {{ shard }}
+benchmarks:
+  make:
+    target: [all]
+"""
+    )
+    output = tmp_path / "out.pkl"
+    args = ["run", str(config), "-o", str(output), "-e", "jobs=4;shard=x"]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    df = pickle.loads(output.read_bytes())["dataframe"]
+    assert df["jobs"].tolist() == [4]
+
+
 def test_run_benchmark_with_multiple_applications(tmp_path):
     config = SpinnerConfig.from_data(
         {
@@ -0,0 +1,128 @@
+import os
+import pickle
+
+import pytest
+from click.testing import CliRunner
+
+from spinner.app import SpinnerApp
+from spinner.cli.main import cli
+from spinner.runner import run
+from spinner.runner.journal import JournalError, ResultJournal, job_key
+from spinner.schema import SpinnerConfig
+
+
+def make_config(command: str = "echo {{ x }}") -> SpinnerConfig:
+    return SpinnerConfig.from_data(
+        {
+            "metadata": {"description": "journal", "version": "1.0", "runs": 2},
+            "applications": {"echo": {"command": command}},
+            "benchmarks": {"echo": {"x": [1, 2]}},
+        }
+    )
+
+
+def write_partial_journal(path, config):
+    """Simulate a run that was killed after completing two jobs."""
+    journal = ResultJournal(path, config)
+    journal.open()
+    for idx in range(2):
+        row = {"name": "echo", "x": 1, "time": -1.0}
+        journal.append(job_key("echo", "echo", {"x": 1}, idx), row)
+    journal.close()
+    # A record that was only partially written when the runner died.
+    with open(path, "ab") as f:
+        f.write(pickle.dumps((job_key("echo", "echo", {"x": 2}, 0), {}))[:-3])
+
+
+def test_resume_skips_completed_jobs(tmp_path):
+    config = make_config()
+    path = tmp_path / "out.pkl.journal"
+    write_partial_journal(path, config)
+
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"), journal=path, resume=True)
+
+    data = pickle.loads(output.read_bytes())
+    df = data["dataframe"]
+    assert data["metadata"]["resumed"] == 2
+    assert sorted(df["x"].tolist()) == [1, 1, 2, 2]
+    assert df[df["x"] == 1]["time"].tolist() == [-1.0, -1.0]
+    assert (df[df["x"] == 2]["time"] > 0).all()
+    assert not path.exists()
+
+
+def test_run_without_resume_discards_journal(tmp_path):
+    config = make_config()
+    path = tmp_path / "out.pkl.journal"
+    write_partial_journal(path, config)
+
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"), journal=path)
+
+    data = pickle.loads(output.read_bytes())
+    assert data["metadata"]["resumed"] == 0
+    assert (data["dataframe"]["time"] > 0).all()
+
+
+def test_resume_rejects_journal_of_other_config(tmp_path):
+    path = tmp_path / "out.pkl.journal"
+    write_partial_journal(path, make_config())
+
+    output = tmp_path / "out.pkl"
+    with pytest.raises(JournalError):
+        run(
+            SpinnerApp.get(),
+            make_config("echo other {{ x }}"),
+            output.open("wb"),
+            journal=path,
+            resume=True,
+        )
+
+
+@pytest.mark.parametrize(
+    "kwargs, what",
+    [
+        ({"benchmark": "echo"}, "benchmark"),
+        ({"shard": (0, 2)}, "shard"),
+        ({"extra_args": {"y": 1}}, "extra args"),
+    ],
+)
+def test_resume_rejects_journal_of_other_run(tmp_path, kwargs, what):
+    path = tmp_path / "out.pkl.journal"
+    write_partial_journal(path, make_config())
+
+    output = tmp_path / "out.pkl"
+    with pytest.raises(JournalError, match=f"different {what}"):
+        run(
+            SpinnerApp.get(),
+            make_config(),
+            output.open("wb"),
+            journal=path,
+            resume=True,
+            **kwargs,
+        )
+
+
+def test_no_default_journal_for_special_files(tmp_path, monkeypatch):
+    config = tmp_path / "bench.yaml"
+    config.write_text(
+        """
+metadata:
+  description: journal
+  version: "1.0"
+  runs: 1
+applications:
+  echo:
+    command: echo {{ x }}
+benchmarks:
+  echo:
+    x: [1]
+"""
+    )
+    journals = []
+    monkeypatch.setattr(
+        ResultJournal, "open", lambda self, **_: journals.append(self.path) or []
+    )
+    result = CliRunner().invoke(cli, ["run", str(config), "-o", os.devnull])
+    assert result.exit_code == 0, result.output
+    assert journals == []
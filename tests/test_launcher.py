@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pytest
+
+from spinner.runner import launcher
+
+
+def test_execute_collects_output():
+    result = asyncio.run(launcher.execute("echo out; echo err >&2; exit 3"))
+    assert result.stdout == "out\n"
+    assert result.stderr == "err\n"
+    assert result.returncode == 3
+    assert result.elapsed > 0
+
+
+def test_execute_timeout_kills_process():
+    t = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(launcher.execute("sleep 5", timeout=0.1))
+    assert time.monotonic() - t < 2
+
+
+def test_execute_multiplexes_children():
+    async def main():
+        return await asyncio.gather(
+            *(launcher.execute("sleep 0.5; echo done") for _ in range(8))
+        )
+
+    t = time.monotonic()
+    results = asyncio.run(main())
+    assert time.monotonic() - t < 2
+    assert [r.stdout for r in results] == ["done\n"] * 8
+
+
+def test_execute_reports_rusage():
+    result = asyncio.run(launcher.execute("python3 -c 'sum(range(3_000_000))'"))
+    columns = result.rusage_columns()
+    assert set(columns) == set(launcher.RUSAGE_FIELDS)
+    assert columns["ru_utime"] > 0
+    assert columns["ru_maxrss"] > 0
+
+
+def test_execute_without_shell():
+    result = asyncio.run(
+        launcher.execute("printf '%s|%s' 'a b' $HOME", shell=False, env={"X": "1"})
+    )
+    # Arguments are split like a shell would, but nothing is expanded.
+    assert result.stdout == "a b|$HOME"
+
+    result = asyncio.run(launcher.execute("env", shell=False, env={"SPINNER_X": "1"}))
+    assert "SPINNER_X=1\n" in result.stdout
+
+
+def test_execute_without_shell_missing_command():
+    result = asyncio.run(launcher.execute("does-not-exist --flag", shell=False))
+    assert result.returncode == 127
+    assert "does-not-exist" in result.stderr
+
+
+def test_execute_without_shell_unrunnable_script(tmp_path):
+    script = tmp_path / "script"
+    script.write_text("echo no shebang\n")
+    script.chmod(0o755)
+    result = asyncio.run(launcher.execute(str(script), shell=False))
+    assert result.returncode == 126
+    assert str(script) in result.stderr
+
+
+def test_execute_without_shell_unbalanced_quote():
+    result = asyncio.run(launcher.execute("echo 'x", shell=False))
+    assert result.returncode == 2
+    assert "quotation" in result.stderr
+
+
+def test_calibrate():
+    overhead = asyncio.run(launcher.calibrate(runs=5))
+    assert set(overhead) == {"shell", "exec"}
+    assert all(len(x) == 5 for x in overhead.values())
+    assert all(0 < x < 10**9 for x in overhead["shell"] + overhead["exec"])
+
+
+def test_execute_measures_nanoseconds():
+    result = asyncio.run(launcher.execute("sleep 0.2"))
+    assert isinstance(result.elapsed_ns, int)
+    assert 0.2e9 <= result.elapsed_ns <= result.elapsed * 1e9
+
+
+def running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            return f.read().rsplit(b")", 1)[1].split()[0] != b"Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_timeout_kills_forked_workers(tmp_path):
+    pids = tmp_path / "pids"
+    # Workers in their own process group (like MPI ranks) are found by session.
+    command = (
+        f"for i in 1 2 3; do sleep 30 & echo $! >> {pids}; done;"
+        " python3 -c 'import os, time; os.setpgid(0, 0);"
+        f' print(os.getpid(), file=open("{pids}", "a")); time.sleep(30)\' &'
+        " wait"
+    )
+    with pytest.raises(TimeoutError):
+        asyncio.run(launcher.execute(command, timeout=0.5))
+    workers = [int(x) for x in pids.read_text().split()]
+    assert len(workers) == 4
+    assert not any(running(pid) for pid in workers)
+
+
+def test_leftovers_escalate_to_sigkill(tmp_path, monkeypatch):
+    monkeypatch.setattr(launcher, "KILL_GRACE", 0.2)
+    pid = tmp_path / "pid"
+    command = f"sh -c 'trap \"\" TERM; sleep 30' & echo $! > {pid}; wait"
+    t = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(launcher.execute(command, timeout=0.2))
+    assert time.monotonic() - t < 2
+    assert not running(int(pid.read_text()))
+
+
+def test_detached_leftovers_are_logged(caplog):
+    result = asyncio.run(launcher.execute("sleep 30 > /dev/null 2>&1 & echo $!"))
+    leftover = int(result.stdout)
+    assert not running(leftover)
+    assert "Terminated 1 processes left running" in caplog.text
+    assert str(leftover) in caplog.text
+
+
+def test_leftovers_in_another_group_are_logged(caplog):
+    command = (
+        "python3 -c 'import os, time; os.setpgid(0, 0); time.sleep(30)'"
+        " > /dev/null 2>&1 & echo $!"
+    )
+    result = asyncio.run(launcher.execute(command))
+    leftover = int(result.stdout)
+    assert not running(leftover)
+    assert "Terminated 1 processes left running" in caplog.text
+
+
+def test_cancelled_execute_terminates_session(tmp_path):
+    pids = tmp_path / "pids"
+
+    async def main():
+        task = asyncio.create_task(
+            launcher.execute(f"sleep 30 & echo $! > {pids}; sleep 30")
+        )
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    t = time.monotonic()
+    asyncio.run(main())
+    assert time.monotonic() - t < 5
+    assert not running(int(pids.read_text()))
@@ -0,0 +1,124 @@
+import asyncio
+import pickle
+import resource
+import signal
+import time
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.runner.launcher import ProcessOutput, execute
+from spinner.runner.limits import limit_breached, resource_limits
+from spinner.schema import SpinnerConfig, SpinnerLimits
+
+
+def run_limited(tmp_path, command, limits, **metadata):
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "limits",
+                "version": "1.0",
+                "runs": 1,
+                "timeout": 20,
+                "retry": 3,
+                **metadata,
+            },
+            "applications": {
+                "app": {
+                    "command": command,
+                    "limits": limits,
+                    "capture": [
+                        {
+                            "type": "matches",
+                            "name": "value",
+                            "pattern": "value=",
+                            "lambda": "lambda x: int(x.split('=')[1])",
+                        }
+                    ],
+                }
+            },
+            "benchmarks": {"app": {}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    data = pickle.loads(output.read_bytes())
+    return data["dataframe"], data["metadata"]["failures"]
+
+
+def test_resource_limits():
+    rlimits = dict(resource_limits(SpinnerLimits(open_files=64, cpu_time=5)))
+    assert rlimits[resource.RLIMIT_NOFILE] == (64, 64)
+    assert rlimits[resource.RLIMIT_CPU] == (5, 6)
+    # Core dumps are disabled unless allowed.
+    assert rlimits[resource.RLIMIT_CORE][0] == 0
+    assert resource.RLIMIT_CORE not in dict(
+        resource_limits(SpinnerLimits(core_dumps=True))
+    )
+
+
+def test_limits_are_applied(tmp_path):
+    df, failures = run_limited(tmp_path, "echo value=$(ulimit -n)", {"open_files": 64})
+    assert df["value"].tolist() == [64]
+    assert failures == {}
+
+
+def test_cpu_time_breach(tmp_path):
+    t = time.monotonic()
+    df, failures = run_limited(
+        tmp_path, "python3 -c 'while True: pass'", {"cpu_time": 1}
+    )
+    # Breaches are not retried.
+    assert time.monotonic() - t < 5
+    assert df["status"].tolist() == ["limit"]
+    assert failures == {"limit": 1}
+
+
+def test_address_space_breach(tmp_path):
+    df, failures = run_limited(
+        tmp_path,
+        "python3 -c 'x = bytearray(1 << 30)'",
+        {"address_space": "256M"},
+    )
+    assert df["status"].tolist() == ["limit"]
+    assert failures == {"limit": 1}
+
+
+def test_open_files_breach(tmp_path):
+    df, failures = run_limited(
+        tmp_path,
+        "python3 -c \"f = [open('/dev/null') for _ in range(100)]\"",
+        {"open_files": 32},
+    )
+    assert failures == {"limit": 1}
+
+
+def test_other_failures_are_not_limits(tmp_path):
+    df, failures = run_limited(tmp_path, "exit 3", {"cpu_time": 10}, retry=0)
+    assert failures == {"failed": 1}
+
+
+def test_cpu_time_of_many_processes_is_not_a_breach():
+    limits = SpinnerLimits(cpu_time=1)
+    # Two processes using 0.8s each, within their own limit.
+    rusage = SimpleNamespace(ru_utime=1.6, ru_stime=0.0, ru_maxrss=1024)
+    result = ProcessOutput("", "", 1, 1.0, rusage=rusage)
+    assert limit_breached(limits, result) is None
+
+    result = ProcessOutput("", "", -signal.SIGXCPU, 1.0, rusage=rusage)
+    assert limit_breached(limits, result) == "cpu_time"
+
+
+def test_limits_are_applied_in_exec_mode():
+    rlimits = resource_limits(SpinnerLimits(open_files=64, cpu_time=5))
+    command = "python3 -c 'import resource as r; print(*r.getrlimit(r.RLIMIT_CPU))'"
+    result = asyncio.run(execute(command, shell=False, rlimits=rlimits))
+    assert result.stdout == "5 6\n"
+
+
+def test_rss_limits_are_rejected():
+    with pytest.raises(ValidationError, match="rss cannot be limited"):
+        SpinnerLimits(rss="1G")
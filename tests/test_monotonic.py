@@ -0,0 +1,68 @@
+import pickle
+
+import pytest
+from pydantic import ValidationError
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.schema import SpinnerBenchmark, SpinnerConfig
+
+
+def test_dominates():
+    benchmark = SpinnerBenchmark(
+        {"size": [1, 2], "mode": ["a", "b"], "monotonic": "size"}
+    )
+    failed = {"size": 2, "mode": "a"}
+    assert benchmark.dominates(failed, {"size": 3, "mode": "a"})
+    assert not benchmark.dominates(failed, failed)
+    assert not benchmark.dominates(failed, {"size": 1, "mode": "a"})
+    assert not benchmark.dominates(failed, {"size": 3, "mode": "b"})
+
+
+def test_monotonic_requires_parameters():
+    with pytest.raises(ValidationError):
+        SpinnerBenchmark({"size": [1, 2], "monotonic": ["threads"]})
+
+
+@pytest.mark.parametrize("warmup", [0, 1])
+def test_dominated_points_are_censored(tmp_path, warmup):
+    log = tmp_path / "log"
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "monotonic",
+                "version": "1.0",
+                "runs": 2,
+                "warmup": warmup,
+            },
+            "applications": {
+                "solve": {
+                    "command": (
+                        f"echo {{{{ size }}}}{{{{ mode }}}} >> {log};"
+                        " test {{ size }} -lt 3 || [ {{ mode }} = b ]"
+                    )
+                }
+            },
+            "benchmarks": {
+                "solve": {
+                    "size": [1, 2, 3, 4, 5],
+                    "mode": ["a", "b"],
+                    "monotonic": ["size"],
+                }
+            },
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    df = pickle.loads(output.read_bytes())["dataframe"]
+
+    executed = log.read_text().split()
+    assert "4a" not in executed and "5a" not in executed
+    assert executed.count("3a") == 2 + warmup
+
+    censored = df[df["status"] == "censored"]
+    assert sorted(censored["size"]) == [4, 4, 5, 5]
+    assert set(censored["mode"]) == {"a"}
+    assert censored["time"].isna().all()
+    assert (df[df["status"] == "ok"]["time"] > 0).all()
+    assert len(df[df["mode"] == "b"]) == 10
@@ -0,0 +1,74 @@
+import pickle
+
+import pytest
+from pydantic import ValidationError
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.schema import SpinnerConfig
+
+
+def run_order(tmp_path, **metadata):
+    log = tmp_path / "log"
+    log.unlink(missing_ok=True)
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "order",
+                "version": "1.0",
+                "runs": 3,
+                **metadata,
+            },
+            "applications": {
+                "a": {"command": f"echo a{{{{ x }}}} >> {log}"},
+                "b": {"command": f"echo b{{{{ x }}}} >> {log}"},
+            },
+            "benchmarks": {"a": {"x": [1, 2]}, "b": {"x": [1]}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    metadata = pickle.loads(output.read_bytes())["metadata"]
+    return log.read_text().split(), metadata
+
+
+def test_sequential_order(tmp_path):
+    executed, metadata = run_order(tmp_path)
+    assert executed == ["a1"] * 3 + ["a2"] * 3 + ["b1"] * 3
+    assert metadata["order"] == "sequential"
+    assert metadata["seed"] is None
+
+
+def test_interleaved_order(tmp_path):
+    executed, _ = run_order(tmp_path, order="interleaved")
+    assert executed == ["a1", "a2", "b1"] * 3
+
+
+def test_random_order_is_reproducible(tmp_path):
+    first, metadata = run_order(tmp_path, order="random", seed=7)
+    second, _ = run_order(tmp_path, order="random", seed=7)
+    assert first == second
+    assert sorted(first) == ["a1"] * 3 + ["a2"] * 3 + ["b1"] * 3
+    assert metadata["seed"] == 7
+
+    # Without a seed, the one that was picked is recorded.
+    unseeded, metadata = run_order(tmp_path, order="random")
+    replayed, _ = run_order(tmp_path, order="random", seed=metadata["seed"])
+    assert unseeded == replayed
+
+
+def test_order_requires_independent_runs():
+    with pytest.raises(ValidationError):
+        SpinnerConfig.from_data(
+            {
+                "metadata": {
+                    "description": "x",
+                    "version": "1.0",
+                    "runs": 3,
+                    "order": "interleaved",
+                    "warmup": 1,
+                },
+                "applications": {},
+                "benchmarks": {},
+            }
+        )
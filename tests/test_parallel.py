@@ -0,0 +1,58 @@
+import pickle
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.schema import SpinnerConfig
+
+
+def make_config(parallelism: int = 1) -> SpinnerConfig:
+    return SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "parallel",
+                "version": "1.0",
+                "runs": 2,
+                "parallelism": parallelism,
+            },
+            "applications": {
+                "echo": {
+                    "command": "echo value={{ x }}",
+                    "capture": [
+                        {
+                            "type": "matches",
+                            "name": "value",
+                            "pattern": "value=",
+                            "lambda": "lambda x: int(x.split('=')[1])",
+                        }
+                    ],
+                }
+            },
+            "benchmarks": {"echo": {"x": [1, 2, 3, 4, 5]}},
+        }
+    )
+
+
+def run_config(tmp_path, config, **kwargs):
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"), **kwargs)
+    data = pickle.loads(output.read_bytes())
+    return data["metadata"], data["dataframe"]
+
+
+def rows(df):
+    return sorted(map(tuple, df[["name", "x", "value"]].values.tolist()))
+
+
+def test_parallel_matches_serial(tmp_path):
+    _, serial = run_config(tmp_path, make_config())
+    metadata, parallel = run_config(tmp_path, make_config(), jobs=4)
+
+    assert metadata["parallelism"] == 4
+    assert len(parallel) == len(serial) == 10
+    assert rows(parallel) == rows(serial)
+
+
+def test_parallelism_from_metadata(tmp_path):
+    metadata, df = run_config(tmp_path, make_config(parallelism=3))
+    assert metadata["parallelism"] == 3
+    assert sorted(df["value"].tolist()) == [1, 1, 2, 2, 3, 3, 4, 4, 5, 5]
@@ -0,0 +1,48 @@
+import math
+
+from spinner.runner.results import RESULT_DTYPES, ResultBuffer
+
+
+def test_result_buffer_builds_frame_with_schema():
+    results = ResultBuffer(["name", "x", "value", "time"])
+    assert results.append({"name": "a", "x": 1, "value": 2.5, "time": 0.1}) == 0
+    assert results.append({"name": "a", "x": 2, "time": 0.2}) == 1
+    assert len(results) == 2
+
+    df = results.to_frame()
+    assert df.columns.tolist() == ["name", "x", "value", "time"]
+    assert df["x"].tolist() == [1, 2]
+    assert df["value"].iloc[0] == 2.5
+    assert math.isnan(df["value"].iloc[1])
+
+
+def test_result_buffer_appends_new_columns_at_the_end():
+    results = ResultBuffer(["name", "time"])
+    results.append({"name": "a", "time": 0.1})
+    results.append({"name": "b", "hosts": "h1,h2", "time": 0.2})
+
+    df = results.to_frame()
+    assert df.columns.tolist() == ["name", "time", "hosts"]
+    assert math.isnan(df["hosts"].iloc[0])
+    assert df["hosts"].iloc[1] == "h1,h2"
+
+
+def test_result_buffer_empty_frame_keeps_columns():
+    df = ResultBuffer(["name", "time"]).to_frame()
+    assert df.empty
+    assert df.columns.tolist() == ["name", "time"]
+
+
+def test_result_buffer_converts_dtypes():
+    results = ResultBuffer(["name", "status", "attempts", "returncode"], RESULT_DTYPES)
+    results.append({"name": "a", "status": "ok", "attempts": 1, "returncode": 0})
+    results.append({"name": "a", "status": "timeout", "attempts": 3})
+    results.append({"name": "a", "status": "censored"})
+
+    df = results.to_frame()
+    assert df["status"].dtype == "category"
+    assert df["status"].cat.categories.tolist()[:2] == ["ok", "timeout"]
+    assert df["attempts"].dtype == "UInt16"
+    assert df["attempts"].tolist()[:2] == [1, 3]
+    assert df["returncode"].dtype == "Int16"
+    assert df["returncode"].isna().tolist() == [False, True, True]
@@ -62,4 +62,5 @@ def test_very_verbose_shows_output(caplog):
 def test_invalid_command_logged(caplog):
     logs, df = run_with_verbosity("command-does-not-exist", 2, caplog)
     assert "Failed to run command." in logs
-    assert df.empty
+    assert df["status"].tolist() == ["failed"]
+    assert df["returncode"].tolist() == [127]
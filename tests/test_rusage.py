@@ -0,0 +1,33 @@
+import pickle
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.runner.launcher import RUSAGE_FIELDS
+from spinner.schema import SpinnerConfig
+
+
+def run_echo(tmp_path, **metadata):
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "rusage",
+                "version": "1.0",
+                "runs": 1,
+                **metadata,
+            },
+            "applications": {"echo": {"command": "echo {{ x }}"}},
+            "benchmarks": {"echo": {"x": [1, 2]}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    return pickle.loads(output.read_bytes())["dataframe"]
+
+
+def test_rusage_columns_opt_in(tmp_path):
+    df = run_echo(tmp_path)
+    assert not set(RUSAGE_FIELDS) & set(df.columns)
+
+    df = run_echo(tmp_path, rusage=True)
+    assert set(RUSAGE_FIELDS) <= set(df.columns)
+    assert (df["ru_maxrss"] > 0).all()
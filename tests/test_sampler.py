@@ -0,0 +1,64 @@
+import os
+import pickle
+
+from spinner.app import SpinnerApp
+from spinner.runner import run
+from spinner.runner.sampler import SAMPLE_COLUMNS, SampleSeries, read_stat
+from spinner.schema import SpinnerConfig
+
+
+def test_series_downsampling_is_bounded():
+    series = SampleSeries(0, max_samples=8)
+    recorded = 0
+    for i in range(1000):
+        if series.due():
+            series.record(series.start + i, {})
+            recorded += 1
+    assert len(series.samples) < 8
+    assert recorded < 100
+    # The samples still span the whole run.
+    assert series.samples[0][0] < 10
+    assert series.samples[-1][0] > 500
+
+
+def test_sampler_records_time_series(tmp_path):
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {
+                "description": "sampler",
+                "version": "1.0",
+                "runs": 1,
+                "sampler": {"interval": 0.02},
+            },
+            "applications": {
+                "alloc": {
+                    "command": (
+                        "python3 -c 'import time; x = bytearray({{ mb }} << 20); "
+                        "time.sleep(0.4)'"
+                    )
+                }
+            },
+            "benchmarks": {"alloc": {"mb": [1, 64]}},
+        }
+    )
+    output = tmp_path / "out.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"))
+    data = pickle.loads(output.read_bytes())
+
+    df, samples = data["dataframe"], data["samples"]
+    assert list(samples.columns) == ["row", *SAMPLE_COLUMNS]
+    assert set(samples["row"]) == set(df.index)
+
+    peak = samples.groupby("row")["rss"].max()
+    small = peak[df.index[df["mb"] == 1][0]]
+    large = peak[df.index[df["mb"] == 64][0]]
+    assert large - small > 32 << 20
+    assert (samples["threads"] >= 1).any()
+
+
+def test_read_stat():
+    fields = read_stat(os.getpid())
+    assert fields[0] == b"R"
+    assert int(fields[2]) == os.getpgid(0)
+    assert int(fields[3]) == os.getsid(0)
+    assert read_stat("missing") is None
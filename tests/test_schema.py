@@ -1,7 +1,13 @@
 import pytest
 from pydantic import ValidationError
 
-from spinner.schema import SpinnerBenchmark, SpinnerConfig, SpinnerMetadata
+from spinner.schema import (
+    SpinnerBenchmark,
+    SpinnerConfig,
+    SpinnerLambda,
+    SpinnerMetadata,
+    SpinnerProgression,
+)
 
 # TEST: metadata -----------------------------------------------------------------------
 
@@ -137,7 +143,7 @@ def test_benchmark_zip_basic():
         }
     )
 
-    combos = bench.sweep_parameters()
+    combos = list(bench.sweep_parameters())
 
     assert combos == [
         {"image": "a", "tb_path": "p1"},
@@ -156,7 +162,7 @@ def test_benchmark_zip_with_extra():
         }
     )
 
-    combos = bench.sweep_parameters()
+    combos = list(bench.sweep_parameters())
     # zipped pairs cross with other params
     assert len(combos) == 4
     images = {c["image"] for c in combos}
@@ -198,11 +204,11 @@ def test_config_supports_custom_benchmark_name_with_app_list():
                 "mpp": {"command": "echo {{ value }}"},
             },
             "benchmarks": {
-                    "deps_impact": {
-                        "apps": ["mpi_openmp", "mpp"],
-                        "value": [1, 2, 3],
-                    }
-                },
+                "deps_impact": {
+                    "apps": ["mpi_openmp", "mpp"],
+                    "value": [1, 2, 3],
+                }
+            },
         }
     )
 
@@ -226,3 +232,161 @@ def test_config_invalid_app_value_reports_validation_error():
                 },
             }
         )
+
+
+def test_lambda_is_compiled_once():
+    first = SpinnerLambda("lambda x: x * 2")
+    second = SpinnerLambda("lambda x: x * 2")
+    assert first.function is second.function
+    assert first(21) == 42
+
+
+def test_benchmark_sweep_is_lazy():
+    bench = SpinnerBenchmark({f"p{i}": list(range(10)) for i in range(10)})
+    assert bench.num_jobs == 10**10
+
+    sweep = bench.sweep_parameters()
+    assert next(sweep) == {f"p{i}": 0 for i in range(10)}
+    assert next(sweep) == {**{f"p{i}": 0 for i in range(9)}, "p9": 1}
+
+
+def test_benchmark_num_points_counts_extra_args():
+    bench = SpinnerBenchmark(
+        {"x": [1, 2], "y": [3, 4], "zip": ["x", "y"], "z": [5, 6, 7]}
+    )
+    extra = {"hosts": "a,b", "sleep": [1, 2]}
+    assert bench.num_points() == 6
+    assert bench.num_points(extra) == 12
+    assert len(list(bench.sweep_parameters(extra))) == 12
+
+
+# TEST: benchmark parameter generators -------------------------------------------------
+
+
+def test_benchmark_range_generators():
+    bench = SpinnerBenchmark(
+        {
+            "threads": {"geom": [1, 256, 2]},
+            "size": {"range": [10, 30, 10]},
+            "ratio": {"range": [0.1, 0.3, 0.1]},
+            "tol": {"logspace": [-3, -1, 3]},
+        }
+    )
+    values = dict(zip(bench.keys, bench.values))
+    assert list(values["threads"]) == [1, 2, 4, 8, 16, 32, 64, 128, 256]
+    assert list(values["size"]) == [10, 20, 30]
+    assert list(values["ratio"]) == [0.1, 0.2, 0.3]
+    assert list(values["tol"]) == [0.001, 0.01, 0.1]
+    assert bench.num_jobs == 9 * 3 * 3 * 3
+    assert len(list(bench.sweep_parameters())) == bench.num_jobs
+
+
+def test_benchmark_generators_are_not_expanded():
+    bench = SpinnerBenchmark(
+        {"n": {"range": [1, 10**12]}, "m": {"geom": [3, 3**20, 3]}}
+    )
+    assert bench.num_jobs == 10**12 * 20
+    assert next(bench.sweep_parameters()) == {"n": 1, "m": 3}
+
+
+def test_benchmark_generator_with_zip():
+    bench = SpinnerBenchmark(
+        {"x": {"range": [1, 3]}, "y": ["a", "b", "c"], "zip": ["x", "y"]}
+    )
+    assert list(bench.sweep_parameters()) == [
+        {"x": 1, "y": "a"},
+        {"x": 2, "y": "b"},
+        {"x": 3, "y": "c"},
+    ]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {"range": [1, 10, 0]},
+        {"range": [10, 1]},
+        {"range": [1]},
+        {"geom": [0, 10]},
+        {"geom": [1, 10, 1]},
+        {"logspace": [0, 1, 0]},
+        {"linspace": [0, 1, 3]},
+        {"range": [1, 2], "geom": [1, 2]},
+        5,
+    ],
+)
+def test_benchmark_invalid_generators(value):
+    with pytest.raises(ValidationError):
+        SpinnerBenchmark({"x": value})
+
+
+def test_progression_subclass_must_compute_items():
+    class Incomplete(SpinnerProgression):
+        kind = "incomplete"
+        length = 1
+
+    with pytest.raises(TypeError, match="item"):
+        Incomplete([1])
+
+
+# TEST: benchmark constraints ----------------------------------------------------------
+
+
+def test_benchmark_where_prunes_sweep():
+    bench = SpinnerBenchmark(
+        {
+            "ranks": [1, 2, 4],
+            "threads": [1, 2, 4],
+            "where": "ranks * threads <= 4",
+        }
+    )
+    combos = list(bench.sweep_parameters())
+    assert all(c["ranks"] * c["threads"] <= 4 for c in combos)
+    assert len(combos) == 6
+    assert bench.num_jobs == 6
+
+
+def test_benchmark_where_list_with_extra_args():
+    bench = SpinnerBenchmark(
+        {
+            "block": {"range": [1, 8]},
+            "where": ["block <= size", "block % 2 == 0"],
+        }
+    )
+    assert list(bench.sweep_parameters({"size": 4})) == [
+        {"block": 2, "size": 4},
+        {"block": 4, "size": 4},
+    ]
+    assert bench.num_points({"size": 4}) == 2
+
+
+def test_config_num_jobs_counts_constrained_points():
+    config = SpinnerConfig.from_data(
+        {
+            "metadata": {"description": "x", "version": "1.0", "runs": 3},
+            "applications": {"a": {"command": "echo {{ x }} {{ y }}"}},
+            "benchmarks": {"a": {"x": [1, 2], "y": [1, 2], "where": "x != y"}},
+        }
+    )
+    assert config.num_jobs == 6
+
+
+@pytest.mark.parametrize("where", ["x <", ["x > 1", 2], {"x": 1}])
+def test_benchmark_invalid_where(where):
+    with pytest.raises(ValidationError):
+        SpinnerBenchmark({"x": [1], "where": where})
+
+
+def test_benchmark_where_undefined_parameter():
+    bench = SpinnerBenchmark({"x": [1], "where": "y > 1"})
+    with pytest.raises(ValueError, match="y"):
+        list(bench.sweep_parameters())
+
+
+@pytest.mark.parametrize("key", ["where", "shard_cost"])
+def test_benchmark_expression_errors_name_the_expression(key):
+    bench = SpinnerBenchmark({"x": [0, 1], key: "1 / x"})
+    with pytest.raises(ValueError, match=r"'1 / x' failed for \{'x': 0\}"):
+        if key == "where":
+            list(bench.sweep_parameters())
+        else:
+            bench.cost({"x": 0})
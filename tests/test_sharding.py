@@ -0,0 +1,140 @@
+import pickle
+
+import pytest
+from click.testing import CliRunner
+
+from spinner.app import SpinnerApp
+from spinner.cli.main import cli
+from spinner.runner import run
+from spinner.runner.progress import RunnerProgress
+from spinner.runner.sharding import (
+    ShardError,
+    merge_shards,
+    partition,
+    shard_points,
+)
+from spinner.schema import SpinnerConfig
+
+
+def make_config(benchmark: dict | None = None, runs: int = 2) -> SpinnerConfig:
+    return SpinnerConfig.from_data(
+        {
+            "metadata": {"description": "shards", "version": "1.0", "runs": runs},
+            "applications": {"echo": {"command": "echo {{ x }} {{ y }}"}},
+            "benchmarks": {"echo": benchmark or {"x": [1, 2, 3], "y": [1, 2]}},
+        }
+    )
+
+
+def run_shard(tmp_path, config, shard, **kwargs):
+    output = tmp_path / f"shard{shard[0]}.pkl"
+    run(SpinnerApp.get(), config, output.open("wb"), shard=shard, **kwargs)
+    return pickle.loads(output.read_bytes())
+
+
+def test_partition_balances_costs():
+    costs = [8, 1, 1, 4, 2, 2, 2, 4]
+    shards = partition(costs, 3)
+    loads = [sum(c for c, s in zip(costs, shards) if s == i) for i in range(3)]
+    assert sorted(loads) == [8, 8, 8]
+    assert partition(costs, 3) == shards
+
+
+def test_partition_deals_equal_costs_round_robin():
+    assert partition([1.0] * 7, 3) == [0, 1, 2, 0, 1, 2, 0]
+
+
+@pytest.mark.parametrize("cost", [None, "x * y"])
+def test_shards_cover_every_point_once(cost):
+    benchmark = {"x": [1, 2, 3, 4], "y": [1, 2, 3]}
+    if cost is not None:
+        benchmark["shard_cost"] = cost
+    benchmarks = list(make_config(benchmark).benchmarks.items())
+
+    selected = [
+        shard_points(benchmarks, None, i, 5)[("echo", "echo")] for i in range(5)
+    ]
+    assert sorted(p for points in selected for p in points) == list(range(12))
+    assert all(len(points) > 0 for points in selected)
+
+
+def test_parameters_named_cost_are_swept(tmp_path):
+    config = make_config({"x": [1], "y": [1], "cost": [1, 2]}, runs=1)
+    data = run_shard(tmp_path, config, (0, 1))
+    assert sorted(data["dataframe"]["cost"].tolist()) == [1, 2]
+
+
+def test_empty_shard_has_no_jobs():
+    config = make_config({"x": [1], "y": [1]})
+    with RunnerProgress(SpinnerApp.get(), config, total=0, disable=True) as progress:
+        assert progress.tasks[0].total == 0
+
+
+def test_merged_shards_match_a_full_run(tmp_path):
+    config = make_config({"x": [1, 2, 3], "y": [1, 2], "shard_cost": "x ** 2"})
+    shards = [run_shard(tmp_path, config, (i, 3)) for i in range(3)]
+    assert [data["metadata"]["shard"] for data in shards] == [(0, 3), (1, 3), (2, 3)]
+
+    merged = merge_shards(shards[::-1])
+    df = merged["dataframe"]
+    assert len(df) == 12
+    points = sorted(zip(df["x"], df["y"]))
+    assert points == sorted([(x, y) for x in [1, 2, 3] for y in [1, 2]] * 2)
+    assert merged["metadata"]["missing_shards"] == []
+    assert len(merged["metadata"]["shards"]) == 3
+    assert merged["metadata"]["start_ts"] == shards[0]["metadata"]["start_ts"]
+
+
+def test_merge_rejects_mismatched_shards(tmp_path):
+    first = run_shard(tmp_path, make_config(), (0, 2))
+    other = run_shard(tmp_path, make_config(runs=1), (1, 2))
+    with pytest.raises(ShardError, match="different configurations"):
+        merge_shards([first, other])
+
+    other = run_shard(tmp_path, make_config(), (1, 2), extra_args={"z": [7, 8]})
+    with pytest.raises(ShardError, match="different extra args"):
+        merge_shards([first, other])
+    other = run_shard(tmp_path, make_config(), (1, 2), benchmark="echo")
+    with pytest.raises(ShardError, match="different benchmarks"):
+        merge_shards([first, other])
+    with pytest.raises(ShardError, match="more than once"):
+        merge_shards([first, first])
+
+
+def test_cli_merge(tmp_path):
+    config = tmp_path / "bench.yaml"
+    config.write_text(
+        """
+metadata:
+  description: shards
+  version: "1.0"
+  runs: 1
+applications:
+  echo:
+    command: echo {{ x }}
+benchmarks:
+  echo:
+    x: [1, 2, 3]
+"""
+    )
+    runner = CliRunner()
+    shards = []
+    for i in range(2):
+        shards.append(str(tmp_path / f"shard{i}.pkl"))
+        result = runner.invoke(
+            cli, ["run", str(config), "--shard", f"{i}/2", "-o", shards[-1]]
+        )
+        assert result.exit_code == 0, result.output
+
+    result = runner.invoke(cli, ["run", str(config), "--shard", "2/2"])
+    assert result.exit_code != 0
+
+    output = tmp_path / "merged.pkl"
+    result = runner.invoke(cli, ["merge", shards[0], "-o", str(output)])
+    assert result.exit_code == 0
+    assert "[1] are missing" in result.output
+
+    result = runner.invoke(cli, ["merge", *shards, "-o", str(output)])
+    assert result.exit_code == 0, result.output
+    df = pickle.loads(output.read_bytes())["dataframe"]
+    assert sorted(df["x"].tolist()) == [1, 2, 3]
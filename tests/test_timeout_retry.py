@@ -33,4 +33,7 @@ def test_timeout_triggers_retry(monkeypatch, caplog):
     assert "Retrying" in caplog.text
     buf.seek(0)
     df = pickle.load(buf)["dataframe"]
-    assert df.empty
+    assert df["status"].tolist() == ["timeout"]
+    assert df["attempts"].tolist() == [2]
+    assert df["returncode"].isna().all()
+    assert df["time"].tolist() == [0.1]
@@ -0,0 +1,95 @@
+"""
+Measure the per-job orchestration overhead of Spinner, without running processes.
+
+For every point of a synthetic sweep, a command is rendered and a fake output is
+parsed by the application captures. The "before" strategy compiles the Jinja
+template and evaluates the capture lambdas on every job, the "after" strategy
+reuses the template and lambdas compiled once, like `InstanceRunner` does.
+
+Usage: python -m tools.orchestration_overhead [--points 100000]
+"""
+
+import argparse
+import time
+
+from jinja2 import Environment
+
+from spinner.runner.capture import CaptureEngine
+from spinner.schema import SpinnerApplication, SpinnerBenchmark
+
+COMMAND = "mpirun -np {{ ranks }} ./solver --size {{ size }} --threads {{ threads }}"
+OUTPUT = (
+    "\n".join(f"residual {i}: {1.0 / (i + 1):.6e}" for i in range(40))
+    + "\nsetup time: 0.12\nsolve time: 1.53\niterations: 40\nstatus: converged\n"
+)
+
+
+def make_application() -> SpinnerApplication:
+    def capture(name, pattern, func):
+        return {"type": "matches", "name": name, "pattern": pattern, "lambda": func}
+
+    return SpinnerApplication(
+        command=COMMAND,
+        capture=[
+            capture("setup", "setup time", "lambda x: float(x.split(':')[1])"),
+            capture("solve", "solve time", "lambda x: float(x.split(':')[1])"),
+            capture("iterations", "iterations", "lambda x: int(x.split(':')[1])"),
+            capture("status", "status", "lambda x: x.split(':')[1].strip()"),
+        ],
+    )
+
+
+def make_benchmark(points: int) -> SpinnerBenchmark:
+    ranks = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+    threads = list(range(1, 11))
+    sizes = list(range(max(1, points // (len(ranks) * len(threads)))))
+    return SpinnerBenchmark({"ranks": ranks, "threads": threads, "size": sizes})
+
+
+def before(application: SpinnerApplication, parameters: dict) -> None:
+    Environment().from_string(application.command.root).render(**parameters)
+    for capture in application.capture:
+        for line in OUTPUT.splitlines():
+            if capture.pattern.match(line):
+                eval(capture.func.root)(line)
+                break
+
+
+def after(engine: CaptureEngine, template, parameters: dict) -> None:
+    template.render(**parameters)
+    stream = engine.stream()
+    stream.feed(1, OUTPUT.encode())
+    stream.close()
+    stream.results()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=100_000)
+    args = parser.parse_args()
+
+    application = make_application()
+    benchmark = make_benchmark(args.points)
+    template = application.command.template(Environment())
+    engine = CaptureEngine(application.capture)
+
+    timings = {}
+    for label, job in [
+        ("before", lambda p: before(application, p)),
+        ("after", lambda p: after(engine, template, p)),
+    ]:
+        count = 0
+        t = time.perf_counter()
+        for parameters in benchmark.sweep_parameters():
+            job(parameters)
+            count += 1
+        timings[label] = (time.perf_counter() - t) / count
+
+    print(f"points: {count}")
+    for label, per_job in timings.items():
+        print(f"{label:>6}: {per_job * 1e6:8.1f} us/job")
+    print(f"speedup: {timings['before'] / timings['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()